@@ -0,0 +1,91 @@
+"""
+Measures CsvSet.import_data time and peak memory (RSS) for different csv set options.
+
+Test data (tests/data/a/*.tsv) is scaled up to a temporary directory, then each option is imported in its own
+process so peak memory is not shared between runs.
+
+    python benchmarks/import_benchmark.py --rows 2000000 --files 4
+    python benchmarks/import_benchmark.py --option memory_map=true
+    python benchmarks/import_benchmark.py --option 'categorical_columns=["Val1", "Val2"]'
+    python benchmarks/import_benchmark.py --option 'skip_blank_lines=true;arrow_strings=true'
+"""
+import argparse
+import json
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "bulkompare"))
+
+COLUMNS = ["Date", "Time", "Empty", "Name", "Val1", "Val2", "Val3"]
+STATUSES = ["OK", "KO", "PENDING", "CANCELLED"]
+
+
+def generate(directory: pathlib.Path, nb_rows: int, nb_files: int):
+    """Writes nb_files tsv files with nb_rows lines in total, in the format of the test data"""
+    rows_per_file = nb_rows // nb_files
+    for i in range(nb_files):
+        with open(directory / f"file{i}.tsv", "w") as f:
+            f.write("\t".join(COLUMNS) + "\n")
+            for j in range(i * rows_per_file, (i + 1) * rows_per_file):
+                f.write(f"{j % 28 + 1:02}/01/2021\t{j % 86400:05}\t\tName {j}\t{j % 97}\t"
+                        f"{STATUSES[j % len(STATUSES)]}\t{j * 7 % 1000}\n")
+
+
+def import_set(directory: pathlib.Path, options: dict) -> dict:
+    """Imports the set with options and returns time and peak memory"""
+    from api.csv_set import CsvSet
+
+    csv_set = CsvSet(extension="tsv", name="bench", directory=directory, encoding="utf8", header=0,
+                     index_columns={"Date", "Time", "Name"}, compare_columns={"Val1", "Val2", "Val3"},
+                     display_columns=["Name"], **options)
+    csv_set.upgrade_status()
+
+    t0 = perf_counter()
+    csv_set.import_data()
+    duration = perf_counter() - t0
+
+    return {"options": options,
+            "rows": csv_set.df.shape[0],
+            "import_s": round(duration, 2),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10),
+            "df_mb": round(csv_set.df.memory_usage(deep=True).sum() / 2**20)}
+
+
+def parse_option(text: str):
+    name, value = text.split("=", maxsplit=1)
+    try:
+        return name, json.loads(value)  # numbers, booleans, lists...
+    except ValueError:
+        return name, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--option", action="append", default=[],
+                        help="csv set options name=value, separated by ';', compared to default options (repeatable)")
+    parser.add_argument("--run", help=argparse.SUPPRESS)  # internal: import in this process
+    args = parser.parse_args()
+
+    if args.run:
+        directory, options = json.loads(args.run)
+        print(json.dumps(import_set(pathlib.Path(directory), options)))
+        return
+
+    variants = [{}] + [dict(parse_option(option) for option in options.split(";")) for options in args.option]
+    with tempfile.TemporaryDirectory(prefix="bulkompare_bench_") as directory:
+        generate(pathlib.Path(directory), args.rows, args.files)
+        for options in variants:
+            output = subprocess.run([sys.executable, __file__, "--run", json.dumps([directory, options])],
+                                    check=True, capture_output=True, text=True).stdout
+            print(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,53 @@
 import logging
 import pathlib
-from typing import Tuple, Set, List
+import tempfile
+from functools import partial
+from typing import Optional, Tuple, Set, List, Iterator, Dict
 
 import pandas as pd
 import numpy as np
+from pandas._typing import ArrayLike
 from pydantic import validator
 
 from api.utils.config import ConfiguredModel
 from api.utils.helpers import log_time_it
-from api.utils.constants import NEW_INDEX
-from api.utils.exceptions import StopError
-from api.utils.constants import SET_NAME, SET_ID
+from api.utils.constants import ROW_KEY, FINGERPRINT, DIFF_COLUMN, Status
+from api.utils.exceptions import StopError, NotSortedError
+from api.utils.constants import SET_NAME, COMPARE_MODES, DEFAULT_MODE, DEFAULT_PARTITIONS, DEFAULT_CHUNK_SIZE
+from api.utils.constants import MODE_MEMORY, MODE_SORTED, DEFAULT_BATCH_RECORDS
 from api.csv_set import CsvSet
 from api.result import Result
+from api.result_lines import ResultLines
 
 
 logger = logging.getLogger(__name__)
 
+# line categories: key in one set only / key in both sets but not unique in a set / key once in each set
+CATEGORIES = IN_ONE, NOT_COMPARABLE, COMPARABLE = 0, 1, 2
+
+
+def classify_lines(keys: ArrayLike, set_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+        Returns the category of each line, from the number of lines with the same key in each set,
+        and the code of each key (lines with the same key have the same code)
+    """
+    codes, uniques = pd.factorize(keys)
+    count_a = np.bincount(codes[set_ids == 0], minlength=len(uniques))[codes]
+    count_b = np.bincount(codes[set_ids == 1], minlength=len(uniques))[codes]
+
+    categories = np.full(len(codes), NOT_COMPARABLE, dtype=np.int8)
+    categories[(count_a == 0) | (count_b == 0)] = IN_ONE
+    categories[(count_a == 1) & (count_b == 1)] = COMPARABLE
+    return categories, codes
+
+
+def not_equal(values_a: ArrayLike, values_b: ArrayLike) -> np.ndarray:
+    """Compares values one by one, missing values in both arrays are equal"""
+    if values_a.dtype != values_b.dtype:
+        values_a, values_b = (np.asarray(values, dtype=object) for values in (values_a, values_b))
+    different = np.asarray(values_a != values_b, dtype=bool)
+    return different & ~(pd.isna(values_a) & pd.isna(values_b))
+
 
 class CsvComparator(ConfiguredModel):
     extension: str
@@ -34,28 +65,36 @@ class CsvComparator(ConfiguredModel):
 
     csv_sets: Tuple[CsvSet, CsvSet] = None, None
 
-    # individual differences
-    _differences_df = None
+    # "memory": both sets are imported, "partitioned": lines are written on disk in partitions compared one by one,
+    # "sorted": files sorted by key are read in chunks of chunk_size lines and merged
+    mode: str = DEFAULT_MODE
+    partitions: int = DEFAULT_PARTITIONS
+    chunk_size: int = DEFAULT_CHUNK_SIZE
 
-    # all lines from both sets
-    _all_df = None
+    # memory (bytes) the comparison is allowed to use, StopError is raised as soon as it would be exceeded
+    memory_budget: Optional[int] = None
 
-    # lines with index only in 1 set
-    _in_one_df = None
+    # release imported columns that are not needed for display once the comparison is done
+    lean: bool = False
 
-    # lines with index in both sets
-    _in_both_df = None
+    # individual differences
+    _differences: Optional[ResultLines] = None
 
-    # subsets of in_both: 1 index in each set -> comparable else -> not comparable
-    _not_comparable_df = None
-    _comparable_df = None
+    # lines with index only in 1 set
+    _in_one: Optional[ResultLines] = None
 
-    # subset of comparable : lines with differences
-    _to_compare_df = None
+    # lines with index in both sets, but more than once in a set
+    _not_comparable: Optional[ResultLines] = None
 
     # result
     result: Result = Result()
 
+    @validator('mode')
+    def validate_mode(cls, v):
+        if v not in COMPARE_MODES:
+            raise ValueError(f"Mode de comparaison inconnu: {v}")
+        return v
+
     @validator('csv_sets', pre=True, always=True)
     def validate_csv_set(cls, v, values):
         logger.debug("Validating a pair of csv sets")
@@ -79,15 +118,33 @@ class CsvComparator(ConfiguredModel):
 
     @property
     def differences_in_common_lines(self):
-        return self._differences_df
+        return self._differences.to_frame() if self._differences else None
 
     @property
     def in_one(self):
-        return self._in_one_df
+        return self._in_one.to_frame() if self._in_one else None
 
     @property
     def not_compared(self):
-        return self._not_comparable_df
+        return self._not_comparable.to_frame() if self._not_comparable else None
+
+    @property
+    def differences_lines(self) -> Optional[ResultLines]:
+        """Individual differences, built when they are read"""
+        return self._differences
+
+    @property
+    def in_one_lines(self) -> Optional[ResultLines]:
+        return self._in_one
+
+    @property
+    def not_compared_lines(self) -> Optional[ResultLines]:
+        return self._not_comparable
+
+    @property
+    def files_size(self):
+        """Total size of the files to compare (bytes)"""
+        return sum(file.stat().st_size for csv_set in self.csv_sets for file in csv_set.files)
 
     @property
     def status(self):
@@ -111,6 +168,11 @@ class CsvComparator(ConfiguredModel):
         for csv_set in self.csv_sets:
             csv_set.update_selected_columns(index_columns, compare_columns, display_columns)
 
+    def upgrade_status(self):
+        """Upgrades the status of both sets to READY_TO_IMPORT, raises StopError if a set can't get there"""
+        for csv_set in self.csv_sets:
+            csv_set.upgrade_status()
+
     def upgrade_status_silently(self):
         """
             Upgrades the status to highest valid status without raising StopError.
@@ -119,6 +181,28 @@ class CsvComparator(ConfiguredModel):
         for csv_set in self.csv_sets:
             csv_set.upgrade_status_silently()
 
+    def without_data(self) -> "CsvComparator":
+        """Returns a copy of the comparator without imported data, to be sent to another process"""
+        comparator = self.copy(update={"csv_sets": tuple(csv_set.without_data() for csv_set in self.csv_sets)})
+        # result lines of a previous comparison are built from the imported data
+        comparator._differences = comparator._in_one = comparator._not_comparable = None
+        return comparator
+
+    def get_results(self) -> tuple:
+        """Returns the result and lines of the last comparison, built so they can be sent to another process"""
+        return (self.result, *(lines.materialized() for lines in (self._differences, self._in_one,
+                                                                  self._not_comparable)))
+
+    def set_results(self, result: Result, differences: ResultLines, in_one: ResultLines, not_compared: ResultLines):
+        """Sets the result and lines of a comparison made by a copy of the comparator (which imported the data)"""
+        self.result = result
+        self._differences = differences
+        self._in_one = in_one
+        self._not_comparable = not_compared
+        for csv_set in self.csv_sets:
+            if csv_set.status >= Status.READY_TO_IMPORT:
+                csv_set.force_status(Status.DATA_IMPORTED)
+
     def _prepare_for_comparison(self):
         """Checks if comparison can be done"""
 
@@ -138,111 +222,327 @@ class CsvComparator(ConfiguredModel):
         """Compares the datasets"""
         self._prepare_for_comparison()
 
-        # prepare full dataframe (both sets)
-        for i, csv_set in enumerate(self.csv_sets):
-            csv_set.import_data()
-            csv_set.df[SET_ID] = i
-        self._all_df = pd.concat((csv_set.df for csv_set in self.csv_sets))
-
-        # count unique set_id for each index : 1 -> index is in 1 set, 2 set_id -> it is in both sets
-        # note : nunique is min 1 (each line has a set_id), max 2 (there are only 2 different set_id)
-        grouped = self._all_df.groupby(by=[NEW_INDEX])
-        grouped_nunique = grouped[SET_ID].nunique()
-        in_one_indexes = grouped_nunique[grouped_nunique == 1].index.tolist()
-        in_one_mask = self._all_df[NEW_INDEX].isin(in_one_indexes)
-
-        self._in_one_df = self._all_df[in_one_mask].copy()
-        self._in_both_df = self._all_df[~in_one_mask].copy()
-
-        # clear self._all_df
-        self._all_df = None
-
-        self.result.nb_in_one = tuple(self._in_one_df[self._in_one_df[SET_ID] == i].shape[0] for i in range(2))
-
-        self.result.nb_in_both = tuple(self._in_both_df[self._in_both_df[SET_ID] == i].shape[0] for i in range(2))
+        mode = self.mode
+        try:
+            self._compare_frames(mode)
+        except NotSortedError as e:
+            logger.info(f"{e}, {self.extension} compared in memory")
+            mode = MODE_MEMORY
+            self._compare_frames(mode)
 
-        # count number of lines for each index : 2 -> index is comparable, more -> not comparable
-        # note : each index has at least 1 line of each set_id (lines from in_both), so if count is 2 it's one of each
-        size = self._in_both_df.groupby(by=[NEW_INDEX]).size()
-        not_comparable_indexes = size[size > 2].index.tolist()
-        not_comparable_mask = self._in_both_df[NEW_INDEX].isin(not_comparable_indexes)
-
-        self._not_comparable_df = self._in_both_df[not_comparable_mask].copy()
-        self._comparable_df = self._in_both_df[~not_comparable_mask].copy()
+        self._create_result()
 
-        self.result.nb_not_comparable = [self._not_comparable_df[self._not_comparable_df[SET_ID] == i].shape[0]
-                                         for i in range(2)]
+        if self.lean and mode == MODE_MEMORY:
+            # differences are built from compare columns
+            self._differences = self._differences.materialized()
+            for csv_set in self.csv_sets:
+                csv_set.release_columns(keep={ROW_KEY, SET_NAME, *self.display_columns})
 
-        # clear self._in_both_df
-        self._in_both_df = None
+    def iter_differences(self, batch_size: int = DEFAULT_BATCH_RECORDS) -> Iterator[List[tuple]]:
+        """
+            Compares the datasets and yields the individual differences by batches of batch_size records
+            (id, column, value in set A, value in set B, display values...), without keeping them
+        """
+        return self._iter_records(0, batch_size)
 
-        nb_comparable = self._comparable_df.shape[0] // 2
+    def iter_in_one(self, batch_size: int = DEFAULT_BATCH_RECORDS) -> Iterator[List[tuple]]:
+        """Same as iter_differences for lines in one set only: records (id, set name, display values...)"""
+        return self._iter_records(1, batch_size)
 
-        self._to_compare_df = self._comparable_df.drop_duplicates(self.compare_columns.union({NEW_INDEX}), keep=False)
+    def iter_not_compared(self, batch_size: int = DEFAULT_BATCH_RECORDS) -> Iterator[List[tuple]]:
+        """Same as iter_differences for lines with a key more than once in a set: records (id, set, display...)"""
+        return self._iter_records(2, batch_size)
 
-        # clear self._comparable_df
-        self._comparable_df = None
+    def _iter_records(self, kind: int, batch_size: int) -> Iterator[List[tuple]]:
+        """
+            Yields the records of one kind of result lines (differences, in one, not compared) by batches, subset
+            by subset as they are compared: in key order, except in partitioned mode (key order in each partition).
+            The result counts are set once all records are yielded.
+        """
+        self._prepare_for_comparison()
 
-        self.result.nb_with_differences = self._to_compare_df.shape[0] // 2
-        self.result.nb_identical = nb_comparable - self.result.nb_with_differences
+        yielded = False
+        try:
+            for batch in self._records(self.mode, kind, batch_size):
+                yielded = True
+                yield batch
+        except NotSortedError as e:
+            if yielded:
+                raise StopError(f"Les lignes de {self.extension} ne sont pas triées, comparaison interrompue")
+            logger.info(f"{e}, {self.extension} compared in memory")
+            yield from self._records(MODE_MEMORY, kind, batch_size)
 
-        self._create_differences()
         self._create_result()
-        self._prepare_for_display()
 
-    def _create_differences(self):
-        """Creates a dataframe with each invidual difference in "in_both"""
-        full_dfs = []
-        compare_dfs = []
-        for i in range(2):
-            df = self._to_compare_df[self._to_compare_df[SET_ID] == i].set_index(NEW_INDEX)
-            full_dfs.append(df)
-            df = df.filter({NEW_INDEX} | self.compare_columns).copy()
-            df = df.sort_index()
-            compare_dfs.append(df)
-
-        dfa, dfb = compare_dfs
+    def _records(self, mode: str, kind: int, batch_size: int) -> Iterator[List[tuple]]:
+        self.result = Result()
+        for result, lines in self._compare_parts(mode):
+            self.result.add_counts(result)
+            for batch in lines[kind].iter_batches(batch_size):
+                yield list(batch.itertuples(index=False, name=None))
 
-        if dfa.equals(dfb):
-            self._differences_df = pd.DataFrame()
-        else:
-            # take care of np.nan != np.nan returning True
-            mask_differences = (dfa != dfb) & ~(dfa.isnull() & dfb.isnull())
-            stack = mask_differences.stack()
-            changes = stack[stack]
-            changes.index.names = ["id", "colonne"]
-            differences_locations = np.where(mask_differences)
-            lot_a_data = dfa.values[differences_locations]
-            lot_b_data = dfb.values[differences_locations]
-            self._differences_df = pd.DataFrame({self.csv_sets[0].name: lot_a_data, self.csv_sets[1].name: lot_b_data},
-                                                index=changes.index)
-
-            # add the display columns
-            for column in self.display_columns:
-                in_set_a = self._differences_df.index.get_level_values(0).map(full_dfs[0][column])
-                in_set_b = self._differences_df.index.get_level_values(0).map(full_dfs[1][column])
-                if in_set_a.tolist() == in_set_b.tolist():
-                    self._differences_df[column] = in_set_a
-                else:
-                    self._differences_df[column] = in_set_a + " / " + in_set_b
-
-            # clear self._to_compare_df
-            self._to_compare_df = None
-
-            self._differences_df.reset_index(inplace=True)
-
-    def _prepare_for_display(self):
-        """Prepares dataframes for display"""
-        self._in_one_df = self._in_one_df.filter([NEW_INDEX, SET_NAME] + self.display_columns) \
-            .sort_values(by=NEW_INDEX).reset_index(drop=True).copy()
-        self._not_comparable_df = self._not_comparable_df[[NEW_INDEX, SET_NAME] + self.display_columns] \
-            .sort_values(by=NEW_INDEX).reset_index(drop=True).copy()
+    def _compare_frames(self, mode: str):
+        """
+            Compares all lines at once, or subset by subset, and merges the results. Lines of the results are built
+            when they are read from the imported sets, or at once from subsets that are not kept in memory:
+            the lines of each subset are written to files until all subsets are compared
+        """
+        self.result = Result()
+        if mode == MODE_MEMORY:
+            result, (self._differences, self._in_one, self._not_comparable) = next(self._compare_parts(mode))
+            self.result.add_counts(result)
+            return
+
+        with tempfile.TemporaryDirectory(prefix="bulkompare_results_") as tmp_dir:
+            paths = [[], [], []]  # files of differences, lines in one set, lines not compared
+            for part, (result, lines) in enumerate(self._compare_parts(mode)):
+                self.result.add_counts(result)
+                for kind, part_lines in enumerate(lines):
+                    paths[kind].append(pathlib.Path(tmp_dir) / f"{kind}_{part}.pkl")
+                    part_lines.unsorted_frame().to_pickle(paths[kind][-1])
+
+            self._differences, self._in_one, self._not_comparable = (
+                ResultLines.from_frame(pd.concat([pd.read_pickle(path) for path in kind_paths], ignore_index=True))
+                for kind_paths in paths)
+
+    def _compare_parts(self, mode: str) -> Iterator[Tuple[Result, Tuple[ResultLines, ResultLines, ResultLines]]]:
+        """
+            Compares all lines at once, or subset by subset. Yields the counts of each subset, and its differences,
+            lines in one set and lines not compared, built when they are read
+        """
+        for dfs in self._frames_to_compare(mode):
+            result, in_one_rows, not_comparable_rows, to_compare_rows = self._classify(dfs)
+            self._share_categories(dfs)
+
+            # differences are only counted here
+            compared, mask = self._differences_mask(dfs, to_compare_rows)
+            counts = dict(zip(compared, mask.sum(axis=0).tolist()))
+            result.nb_differences = int(mask.sum())
+            result.nb_differences_by_column = {col: counts.get(col, 0) for col in sorted(self.compare_columns)}
+
+            yield result, (ResultLines(dfs[0][ROW_KEY].array.take(to_compare_rows[0]), mask.sum(axis=1),
+                                       partial(self._differences_of_lines, dfs, to_compare_rows)),
+                           self._result_lines(dfs, in_one_rows),
+                           self._result_lines(dfs, not_comparable_rows))
+
+    def _frames_to_compare(self, mode: str) -> Iterator[List[pd.DataFrame]]:
+        """Yields the pairs of dataframes to compare: full sets, partitions of sets, or ranges of keys of sorted sets"""
+        if mode == MODE_SORTED:
+            yield from self._sorted_windows()
+            return
+
+        if mode == MODE_MEMORY:
+            if self.memory_budget is not None:
+                self._check_memory_budget(sum(csv_set.estimate_memory_usage() for csv_set in self.csv_sets))
+            for csv_set in self.csv_sets:
+                csv_set.import_data()
+            yield [csv_set.df for csv_set in self.csv_sets]
+            return
+
+        if self.memory_budget is not None:
+            self._check_memory_budget(sum(csv_set.estimate_memory_usage() for csv_set in self.csv_sets) //
+                                      self.partitions)
+        with tempfile.TemporaryDirectory(prefix="bulkompare_") as tmp_dir:
+            directories = [pathlib.Path(tmp_dir) / str(i) for i in range(2)]
+            for csv_set, directory in zip(self.csv_sets, directories):
+                csv_set.partition(directory, self.partitions, self.chunk_size)
+
+            for partition in range(self.partitions):
+                yield [csv_set.read_partition(directory, partition)
+                       for csv_set, directory in zip(self.csv_sets, directories)]
+
+    def _sorted_windows(self) -> Iterator[List[pd.DataFrame]]:
+        """
+            Reads both sets chunk by chunk and yields the lines of both sets in consecutive ranges of keys.
+            Lines with keys under the last key read in each set are complete: they are yielded, the others are kept
+            until more lines are read. Raises NotSortedError as soon as lines are not sorted by key.
+        """
+        streams = [self._sorted_chunks(csv_set) for csv_set in self.csv_sets]
+        buffers = [csv_set.empty_frame() for csv_set in self.csv_sets]
+        last_keys = [None, None]
+        exhausted = [False, False]
+
+        while not all(exhausted):
+            # read the set that is behind, so that both buffers cover the same keys
+            behind = min((i for i in range(2) if not exhausted[i]),
+                         key=lambda i: (last_keys[i] is not None, last_keys[i]))
+            chunk = next(streams[behind], None)
+            if chunk is None:
+                exhausted[behind] = True
+            else:
+                buffer = buffers[behind]
+                buffers[behind] = pd.concat([buffer, chunk], ignore_index=True) if not buffer.empty else chunk
+                last_keys[behind] = chunk[ROW_KEY].iloc[-1]
+
+            if any(last_keys[i] is None for i in range(2) if not exhausted[i]):
+                continue
+            if all(exhausted):
+                break
+            boundary = min(last_keys[i] for i in range(2) if not exhausted[i])
+            ends = [buffer[ROW_KEY].searchsorted(boundary, side="left") for buffer in buffers]
+            if any(ends):
+                yield [buffer.iloc[:end].reset_index(drop=True) for buffer, end in zip(buffers, ends)]
+                buffers = [buffer.iloc[end:].reset_index(drop=True) for buffer, end in zip(buffers, ends)]
+
+        yield buffers
+
+    def _sorted_chunks(self, csv_set: CsvSet) -> Iterator[pd.DataFrame]:
+        """Yields the chunks of lines of a set (empty chunks are skipped), checking that keys are sorted"""
+        last_key = None
+        for chunk in csv_set.iter_chunks(self.chunk_size):
+            if chunk.empty:
+                continue
+            keys = chunk[ROW_KEY]
+            if not keys.is_monotonic_increasing or (last_key is not None and keys.iloc[0] < last_key):
+                raise NotSortedError(f"Lines of {csv_set} are not sorted by key")
+            last_key = keys.iloc[-1]
+            yield chunk
+
+    def _check_memory_budget(self, needed: int):
+        """Raises StopError if the memory needed is over budget"""
+        if self.memory_budget is not None and needed > self.memory_budget:
+            raise StopError(f"Mémoire insuffisante pour comparer {self.extension} : "
+                            f"{needed / 2**20:.0f} Mo nécessaires, {self.memory_budget / 2**20:.0f} Mo autorisés")
+
+    def _classify(self, dfs: List[pd.DataFrame]):
+        """
+            Classifies the lines of both dataframes. Returns the line counts and the positions of lines (an array
+            for each dataframe) in one set only, not comparable, and comparable with differences (aligned by key)
+        """
+        set_sizes = [df.shape[0] for df in dfs]
+
+        # comparison works on positions in each set, the only extra data is the keys, codes and fingerprints
+        if self.memory_budget is not None:  # measuring object columns is a full pass over their cells
+            self._check_memory_budget(sum(df.memory_usage(deep=True).sum() for df in dfs) +
+                                      sum(set_sizes) * (np.dtype(object).itemsize + 3 * np.dtype(np.intp).itemsize))
+
+        # classify all lines in one pass, then count lines of each category in each set
+        set_ids = np.repeat(np.arange(2, dtype=np.int8), set_sizes)
+        keys = pd.concat([df[ROW_KEY] for df in dfs], ignore_index=True).array  # arrow strings are not converted
+        categories, codes = classify_lines(keys, set_ids)
+        counts = np.bincount(categories * 2 + set_ids, minlength=2 * len(CATEGORIES)).reshape(-1, 2)
+
+        result = Result()
+        result.nb_in_one = tuple(counts[IN_ONE].tolist())
+        result.nb_not_comparable = tuple(counts[NOT_COMPARABLE].tolist())
+        result.nb_in_both = tuple((counts[NOT_COMPARABLE] + counts[COMPARABLE]).tolist())
+
+        categories = np.split(categories, [set_sizes[0]])
+        codes = np.split(codes, [set_sizes[0]])
+        in_one_rows = tuple(np.flatnonzero(cat == IN_ONE) for cat in categories)
+        not_comparable_rows = tuple(np.flatnonzero(cat == NOT_COMPARABLE) for cat in categories)
+
+        # comparable keys are once in each set: sorting by key code aligns lines
+        comparable_rows = []
+        for cat, set_codes in zip(categories, codes):
+            rows = np.flatnonzero(cat == COMPARABLE)
+            comparable_rows.append(rows[np.argsort(set_codes[rows], kind="stable")])
+
+        # keep lines with different fingerprints (at least one different compare column)
+        fingerprints_a, fingerprints_b = (df[FINGERPRINT].to_numpy()[rows] for df, rows in zip(dfs, comparable_rows))
+        with_differences = fingerprints_a != fingerprints_b
+        to_compare_rows = tuple(rows[with_differences] for rows in comparable_rows)
+
+        result.nb_with_differences = int(with_differences.sum())
+        result.nb_identical = with_differences.shape[0] - result.nb_with_differences
+        result.nb_differences = 0  # counted from the differences mask
+
+        return result, in_one_rows, not_comparable_rows, to_compare_rows
+
+    def _share_categories(self, dfs: List[pd.DataFrame]):
+        """
+            Gives the categorical compare columns the same categories in both dataframes,
+            so their values are compared by integer code
+        """
+        for column in self.compare_columns:
+            is_categorical = [isinstance(df[column].dtype, pd.CategoricalDtype) for df in dfs]
+            if not any(is_categorical):
+                continue
+
+            categories = [df[column].cat.categories if categorical else pd.Index(df[column].unique())
+                          for df, categorical in zip(dfs, is_categorical)]
+            if all(is_categorical) and categories[0].equals(categories[1]):
+                continue
+
+            dtype = pd.CategoricalDtype(categories[0].union(categories[1]))
+            for df in dfs:
+                df[column] = df[column].astype(dtype)
+
+    def _differences_mask(self, dfs: List[pd.DataFrame],
+                          rows: Tuple[np.ndarray, np.ndarray]) -> Tuple[Dict[str, tuple], np.ndarray]:
+        """
+            Returns the values of the compare columns with differences in lines at given positions (aligned by key),
+            and the mask of different values (lines x columns)
+        """
+        # most compare columns never differ: only columns with at least a difference are compared cell by cell
+        # (same columns order in both sets)
+        compared = {}
+        for column in (col for col in dfs[0].columns if col in self.compare_columns):
+            values = tuple(df[column].array.take(set_rows) for df, set_rows in zip(dfs, rows))
+            if not values[0].equals(values[1]):
+                compared[column] = values
+
+        if not compared:
+            return compared, np.zeros((rows[0].shape[0], 0), dtype=bool)
+        return compared, np.column_stack([not_equal(*values) for values in compared.values()])
+
+    def _differences_of_lines(self, dfs: List[pd.DataFrame], rows: Tuple[np.ndarray, np.ndarray],
+                              units: np.ndarray) -> pd.DataFrame:
+        """Creates the differences of the lines at positions units in rows"""
+        return self._create_differences(dfs, tuple(set_rows[units] for set_rows in rows))
+
+    def _create_differences(self, dfs: List[pd.DataFrame], rows: Tuple[np.ndarray, np.ndarray]) -> pd.DataFrame:
+        """Creates a dataframe with each invidual difference in lines at given positions (aligned by key)"""
+        names = [csv_set.name for csv_set in self.csv_sets]
+        compared, mask = self._differences_mask(dfs, rows)
+        if not compared:
+            return pd.DataFrame(columns=[ROW_KEY, DIFF_COLUMN] + names + self.display_columns)
+
+        # one nonzero pass on the mask gives the changed cells, ordered by line then column
+        lines, columns = np.nonzero(mask)
+
+        differences_df = pd.DataFrame({ROW_KEY: dfs[0][ROW_KEY].array.take(rows[0][lines]),
+                                       DIFF_COLUMN: np.array(list(compared), dtype=object)[columns]})
+        for i, name in enumerate(names):
+            cells = np.empty(lines.shape[0], dtype=object)
+            for j, values in enumerate(compared.values()):
+                in_column = columns == j
+                cells[in_column] = np.asarray(values[i].take(lines[in_column]), dtype=object)
+            differences_df[name] = cells
+
+        # display values of each line with differences, "A / B" where they differ in both sets
+        for column in self.display_columns:
+            in_set_a, in_set_b = (np.asarray(df[column].array.take(set_rows), dtype=object)
+                                  for df, set_rows in zip(dfs, rows))
+            different = in_set_a != in_set_b
+            display = in_set_a.copy()
+            display[different] = in_set_a[different] + " / " + in_set_b[different]
+            differences_df[column] = display[lines]
+
+        return differences_df
+
+    def _result_lines(self, dfs: List[pd.DataFrame], rows: Tuple[np.ndarray, np.ndarray]) -> ResultLines:
+        """Returns the lines at given positions in each set, lines of set A first"""
+        keys = pd.concat([df[ROW_KEY].take(set_rows) for df, set_rows in zip(dfs, rows)]).array
+        return ResultLines(keys, np.ones(len(keys), dtype=np.intp), partial(self._take_lines, dfs, rows))
+
+    def _take_lines(self, dfs: List[pd.DataFrame], rows: Tuple[np.ndarray, np.ndarray],
+                    units: np.ndarray) -> pd.DataFrame:
+        """
+            Returns the lines at positions units (in rows of set A, then rows of set B) with their key, set name
+            and display columns, in the order of units
+        """
+        columns = [ROW_KEY, SET_NAME] + self.display_columns
+        in_set_b = units >= rows[0].shape[0]
+        set_units = units[~in_set_b], units[in_set_b] - rows[0].shape[0]
+        lines = pd.concat([df.iloc[set_rows[positions], df.columns.get_indexer(columns)]
+                           for df, set_rows, positions in zip(dfs, rows, set_units)])
+        # lines of set A were put first
+        return lines.take(np.argsort(np.argsort(in_set_b, kind="stable")))
 
     def _create_result(self):
         """Creates the Result of the comparison"""
 
-        self.result.nb_differences = self._differences_df.shape[0]
-
         nb_in_one = sum(self.result.nb_in_one)
 
         if self.result.nb_differences == 0:
@@ -259,8 +559,10 @@ class CsvComparator(ConfiguredModel):
                 self.result.conclusion += f" et {nb_in_one} ligne(s) dans un set seulement"
 
         name_a, name_b = self.names
-        self.result.details = (f"Nombre total de lignes : {self.csv_sets[0].df.shape[0]} dans {name_a}, "
-                               f"{self.csv_sets[1].df.shape[0]} dans {name_b}",
+        nb_lines = [nb_in_one + nb_in_both for nb_in_one, nb_in_both in zip(self.result.nb_in_one,
+                                                                           self.result.nb_in_both)]
+        self.result.details = (f"Nombre total de lignes : {nb_lines[0]} dans {name_a}, "
+                               f"{nb_lines[1]} dans {name_b}",
 
                                f"Lignes présentes dans un seul lot : {self.result.nb_in_one[0]} dans {name_a}, "
                                f"{self.result.nb_in_one[1]} dans {name_b} "
@@ -276,3 +578,8 @@ class CsvComparator(ConfiguredModel):
                                f"-> dont {self.result.nb_identical} ligne(s) identique(s)",
 
                                f"-> dont {self.result.nb_with_differences} ligne(s) avec différence(s)")
+
+        by_column = ", ".join(f"{column} : {count}" for column, count in self.result.nb_differences_by_column.items()
+                              if count)
+        if by_column:
+            self.result.details += (f"Valeurs différentes par colonne : {by_column}",)
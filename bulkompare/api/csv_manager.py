@@ -6,22 +6,30 @@ from pydantic import validator
 
 from api import bundle_dir
 from api.utils.config import ConfiguredModel
-from api.utils.constants import Status, home_dir
+from api.utils.constants import Status, home_dir, DEFAULT_COMPARE_WORKERS, HEADER_WORKERS
 from api.csv_comparator import CsvComparator
+from api.result_lines import ResultFrames
 from api.utils.exceptions import StopError
+from api.utils.helpers import parallel_map
 
 logger = logging.getLogger(__name__)
 
 
+def compare_in_worker(comparator: CsvComparator) -> tuple:
+    """Compares in a worker process, only results are sent back (imported data stays in the worker)"""
+    comparator.compare()
+    return comparator.get_results()
+
+
 class CsvManager(ConfiguredModel):
     """Top-level class of the API. Manages all CsvComparator"""
     names: Tuple[str, str] = "Set A", "Set B"
     directories: Tuple[pathlib.Path, pathlib.Path] = home_dir, home_dir
     comparators: List[CsvComparator] = []
     results: Optional[dict] = None
-    differences: Optional[dict] = None
-    in_one: Optional[dict] = None
-    not_compared: Optional[dict] = None
+
+    # number of comparators compared concurrently, in a process pool
+    workers: int = DEFAULT_COMPARE_WORKERS
 
     @validator('comparators', pre=True, always=True, each_item=True)
     def validate_csv_comparator(cls, v, values):
@@ -36,6 +44,22 @@ class CsvManager(ConfiguredModel):
     def compare_columns(self):
         return {comp.extension: comp.csv_sets[0].compare_columns for comp in self.comparators}
 
+    @property
+    def differences(self) -> Optional[ResultFrames]:
+        """Differences by extension, built when they are accessed"""
+        if self.results is not None:
+            return ResultFrames({comp.extension: comp.differences_lines for comp in self.comparators})
+
+    @property
+    def in_one(self) -> Optional[ResultFrames]:
+        if self.results is not None:
+            return ResultFrames({comp.extension: comp.in_one_lines for comp in self.comparators})
+
+    @property
+    def not_compared(self) -> Optional[ResultFrames]:
+        if self.results is not None:
+            return ResultFrames({comp.extension: comp.not_compared_lines for comp in self.comparators})
+
     @property
     def status(self):
         if self.comparators:
@@ -78,20 +102,25 @@ class CsvManager(ConfiguredModel):
             Upgrades the status to highest valid status without raising StopError.
             It doesn't revalidate the current status.
         """
-        for comparator in self.comparators:
-            comparator.upgrade_status_silently()
+        # mostly reading headers of files, comparators are upgraded concurrently
+        parallel_map(CsvComparator.upgrade_status_silently, self.comparators, HEADER_WORKERS, "thread")
 
         logger.info(f"Manager status updated to {self.status}")
 
     def compare(self):
         """Starts the comparisons"""
-        for comparator in self.comparators:
-            comparator.compare()
+        if self.workers <= 1 or len(self.comparators) <= 1:
+            for comparator in self.comparators:
+                comparator.compare()
+        else:
+            # largest comparisons first so that the last ones to finish are short
+            comparators = sorted(self.comparators, key=lambda comp: comp.files_size, reverse=True)
+            results = parallel_map(compare_in_worker, [comp.without_data() for comp in comparators],
+                                   workers=self.workers, executor="process")
+            for comparator, comparator_results in zip(comparators, results):
+                comparator.set_results(*comparator_results)
 
         self.results = {comp.extension: comp.result for comp in self.comparators}
-        self.differences = {comp.extension: comp.differences_in_common_lines for comp in self.comparators}
-        self.in_one = {comp.extension: comp.in_one for comp in self.comparators}
-        self.not_compared = {comp.extension: comp.not_compared for comp in self.comparators}
 
     def save_selections(self, path=None):
         """Saves selections to a file"""
@@ -114,6 +143,9 @@ class CsvManager(ConfiguredModel):
                     "header": ...,
                     "separator": ...,
                     "strip": ...,
+                    "engine": ...,
+                    "categorical_columns": ...,
+                    "categorical_threshold": ...,
                     "mapping": ...
                 }}
             }}
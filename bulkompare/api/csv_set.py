@@ -1,17 +1,40 @@
+import codecs
+import contextlib
+import importlib.util
+import io
 import logging
-from typing import Optional, Set, Dict, Tuple, List
+import mmap
+from functools import partial
+from typing import Optional, Set, Dict, Tuple, List, Iterator
 
 import pandas as pd
+from pandas._libs.parsers import STR_NA_VALUES
 from pydantic import validator
 
 from api.utils.config import ConfiguredModel
 from api.utils.constants import *
-from api.utils.helpers import log_time_it
+from api.utils.helpers import log_time_it, parallel_map, EXECUTORS
+from api.utils.cache import FrameCache, header_cache
+from api.utils.files import COMPRESSED_SUFFIXES, is_compressed, open_binary, decompressed_size
 from api.utils.exceptions import StopError
 
 
 logger = logging.getLogger(__name__)
 
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+def strip_values(values: pd.Series) -> pd.Series:
+    """
+        Removes whitespace at beginning/end of values. Categories are stripped once, merged if they become equal,
+        and kept sorted
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.str.strip()
+
+    codes, categories = pd.factorize(values.cat.categories.str.strip(), sort=True)
+    return pd.Series(pd.Categorical.from_codes(codes[values.cat.codes], categories), index=values.index)
+
 
 class CsvSet(ConfiguredModel):
     status: Status = Status.INITIALIZED
@@ -27,6 +50,35 @@ class CsvSet(ConfiguredModel):
     # remove whitespace at beginning/end of every field
     strip: Optional[bool] = DEFAULT_STRIP
 
+    # csv parser engine ("auto" or one of PARSER_ENGINES), falls back to a slower one if properties require it
+    engine: str = DEFAULT_ENGINE
+
+    # number of files parsed concurrently, and pool used for it ("thread" or "process")
+    workers: int = DEFAULT_WORKERS
+    executor: str = DEFAULT_EXECUTOR
+
+    # directory where imported data is cached (no cache if None), and max size of the cache (bytes)
+    cache_dir: Optional[pathlib.Path] = None
+    cache_size: int = DEFAULT_CACHE_SIZE
+
+    # parse files from a memory map instead of buffered reads (uncompressed files only)
+    memory_map: bool = False
+
+    # concatenate files without their headers in batches parsed at once (for many small files with the same columns)
+    batch_files: bool = False
+
+    # keep parsed files in memory and only parse files added or modified, or columns selected, since last import.
+    # The parsed files are a second copy of the raw columns next to the imported data (about twice the memory)
+    incremental: bool = False
+
+    # columns stored as categoricals (after renaming), and maximum ratio of distinct values in a sample of lines
+    # for the other columns to be stored as categoricals (no automatic detection if None)
+    categorical_columns: Set[str] = set()
+    categorical_threshold: Optional[float] = None
+
+    # hold imported strings in arrow arrays instead of python objects (needs pyarrow)
+    arrow_strings: bool = False
+
     # Mapping (dict key is name in csv, value is new name for dataset)
     mapping: Dict[str, str] = {}
 
@@ -47,6 +99,12 @@ class CsvSet(ConfiguredModel):
     renamed_columns_set: Set[str] = set()  # same, as a set
     df: Optional[pd.DataFrame] = None  # full set of data
 
+    # parsed files kept for incremental import: {file: ((size, modification time), df with all columns parsed so far)},
+    # and how they were parsed
+    _chunks: dict = {}
+    _chunks_signature: Optional[str] = None
+    _imported_key: Optional[str] = None  # files and import properties of df, its columns are reused if they match
+
     @validator('comment')
     def validate_comment(cls, v):
         return v or None
@@ -55,6 +113,24 @@ class CsvSet(ConfiguredModel):
     def validate_separator(cls, v):
         return v or "\t"
 
+    @validator('engine')
+    def validate_engine(cls, v):
+        if v not in (ENGINE_AUTO, *PARSER_ENGINES):
+            raise ValueError(f"Moteur inconnu: {v}")
+        return v
+
+    @validator('executor')
+    def validate_executor(cls, v):
+        if v not in EXECUTORS:
+            raise ValueError(f"Type de pool inconnu: {v}")
+        return v
+
+    @validator('arrow_strings')
+    def validate_arrow_strings(cls, v):
+        if v and not PYARROW_AVAILABLE:
+            raise ValueError("Le module pyarrow est nécessaire pour les chaînes arrow")
+        return v
+
     def __str__(self):
         return f"CsvSet {self.name}"
 
@@ -131,7 +207,7 @@ class CsvSet(ConfiguredModel):
                 raise StopError(f"Le répertoire {self.directory} n'existe pas ({self.name})")
 
             # reset list of files
-            self.files = tuple(self.directory.glob(f"*.{self.extension}"))
+            self.files = self._glob_files()
 
             if not self.files:
                 raise StopError(f"Aucun fichier {self.extension} trouvé dans {self.name}")
@@ -141,13 +217,11 @@ class CsvSet(ConfiguredModel):
         if self.status == Status.FILES_SELECTED and target > Status.FILES_SELECTED:
             # => Check that some columns are available in each set
             # get the list of available columns
-            common_columns = tuple()
-            for i, file in enumerate(self.files):
-                cols_in_this_file = tuple(self._read_csv(file, nrows=0).columns.tolist())
-                if i == 0:
-                    common_columns = cols_in_this_file
-                else:
-                    common_columns = (col for col in common_columns if col in cols_in_this_file)
+            files_columns = parallel_map(self._read_columns, self.files, HEADER_WORKERS, "thread")
+            header_cache.save()
+            common_columns = files_columns[0]
+            for cols_in_this_file in files_columns[1:]:
+                common_columns = tuple(col for col in common_columns if col in cols_in_this_file)
             self.original_columns = tuple(common_columns)
             self.original_columns_set = set(self.original_columns)
             self.renamed_columns = tuple()
@@ -200,37 +274,494 @@ class CsvSet(ConfiguredModel):
             raise StopError(f"{self.name} n'est pas prêt pour l'import")
 
         # import all csv full files
-        usecols = self.index_columns.union(self.compare_columns, self.display_columns)
-        raw_dfs = [self._read_csv(f, usecols=usecols, dtype=str) for f in self.files]
-        self.df = pd.concat(raw_dfs, ignore_index=True, sort=False)
-        self.df.fillna("", inplace=True)
+        usecols = self._usecols()
+        cache = FrameCache(self.cache_dir, self.cache_size) if self.cache_dir else None
+        cache_key = self._cache_key(usecols) if cache else None
+        df = cache.get(cache_key) if cache else None
+
+        import_key = None if self.incremental else self._import_key()  # incremental import lists files again
+        if df is None:
+            logger.debug(f"{self} ({self.extension}) parsed with {self._select_engine()} engine")
+            if self.incremental:
+                raw_dfs = self._read_files(usecols)
+            else:
+                # only the selection changed since last import: parse the columns that were not imported
+                reused = self._imported_columns(usecols) if import_key == self._imported_key else None
+                to_parse = usecols if reused is None else [col for col in usecols if col not in reused.columns]
+                if not to_parse:
+                    raw_dfs = []
+                elif self.batch_files and self._can_batch():
+                    raw_dfs = self._parse_batches(to_parse)
+                else:
+                    raw_dfs = self._parse_files(self.files, to_parse)
+                if reused is not None:
+                    logger.debug(f"{self} ({self.extension}): {reused.shape[1]} imported column(s) reused")
+                    parsed = pd.concat(raw_dfs, ignore_index=True, sort=False) if raw_dfs else None
+                    raw_dfs = [pd.concat([reused, parsed], axis=1)[usecols]]
+            df = self._prepare(pd.concat(raw_dfs, ignore_index=True, sort=False))
+            if cache:
+                cache.put(cache_key, df)
+        elif self.arrow_strings:
+            df = self._to_arrow_strings(df)  # cache files don't keep the string storage
+
+        df[SET_NAME] = self.name
+        self.df = df
+        self._imported_key = import_key
 
-        if self.strip:
-            # remove whitespace
-            self.df = self.df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+        self.status = Status.DATA_IMPORTED
+
+    def _parse_files(self, files, usecols: List[str]) -> List[pd.DataFrame]:
+        """Parses files concurrently, results are in the same order as files"""
+        parser = self._parser()
+        return parallel_map(partial(parser._read_file, usecols=usecols), files, self.workers, self.executor)
+
+    def _parser(self) -> "CsvSet":
+        """Returns the csv set to parse files with: a process pool pickles it, don't send imported data along"""
+        if self.executor != "process":
+            return self
+        return self.without_data()
+
+    def without_data(self) -> "CsvSet":
+        """Returns a copy of the csv set without imported data, to be sent to another process"""
+        csv_set = self.copy(update={"df": None})
+        csv_set._chunks = {}
+        csv_set._chunks_signature = None
+        csv_set._imported_key = None
+        return csv_set
+
+    def _can_batch(self) -> bool:
+        """Checks if files can be concatenated: same columns in the same order, newline is the same in the encoding"""
+        if "\n".encode(self.encoding) != b"\n":
+            logger.debug(f"{self} ({self.extension}): encoding {self.encoding} can't be parsed in batches")
+            return False
+        if len(set(parallel_map(self._read_columns, self.files, HEADER_WORKERS, "thread"))) > 1:
+            logger.debug(f"{self} ({self.extension}): files have different columns and can't be parsed in batches")
+            return False
+        return True
+
+    def _parse_batches(self, usecols: List[str]) -> List[pd.DataFrame]:
+        """Parses files in batches of about BATCH_SIZE bytes: data lines of the files are parsed at once"""
+        batches = [[]]
+        batch_size = 0
+        for file in self.files:
+            if batch_size > BATCH_SIZE:
+                batches.append([])
+                batch_size = 0
+            batches[-1].append(file)
+            batch_size += file.stat().st_size
+
+        logger.debug(f"{self} ({self.extension}): {len(self.files)} files parsed in {len(batches)} batch(es)")
+        parser = self._parser()
+        return parallel_map(partial(parser._parse_batch, usecols=usecols), batches, self.workers, self.executor)
+
+    @log_time_it
+    def _parse_batch(self, files: List[pathlib.Path], usecols: List[str]) -> pd.DataFrame:
+        """Parses the data lines of files, after the header line of the first one"""
+        stream = io.BytesIO()
+        for i, file in enumerate(files):
+            with open_binary(file) as f:
+                header_line, data = self._split_header(f.read())
+            if i == 0:
+                stream.write(header_line)
+            if data and not data.endswith(b"\n"):
+                data += b"\n"
+            stream.write(data)
+
+        stream.seek(0)
+        return self._read_csv(stream, usecols=usecols, dtype=str, header=0)
+
+    def _split_header(self, content: bytes) -> Tuple[bytes, bytes]:
+        """
+            Splits file content in header line and data lines. Like pandas, lines before the header are counted
+            without comment lines, and without blank lines if they are skipped.
+        """
+        comment = self.comment.encode(self.encoding) if self.comment else None
+        position = 0
+        line_number = 0
+        while position < len(content):
+            end = content.find(b"\n", position)
+            end = len(content) if end == -1 else end + 1
+            line = content[position:end]
+            stripped = line.strip()
+            is_skipped = ((comment and stripped.startswith(comment)) or
+                          (self.skip_blank_lines and not stripped))
+            if not is_skipped:
+                if line_number == self.header:
+                    if not line.endswith(b"\n"):
+                        line += b"\n"
+                    return line, content[end:]
+                line_number += 1
+            position = end
+
+        return b"", b""
+
+    def _read_files(self, usecols: List[str]) -> List[pd.DataFrame]:
+        """
+            Reads the files for an incremental import: files unchanged since last import are not parsed again,
+            only the selected columns that were not parsed yet are read from them
+        """
+        # files may have been added or removed
+        self.files = self._glob_files()
+        if not self.files:
+            raise StopError(f"Aucun fichier {self.extension} trouvé dans {self.name}")
+
+        signature = FrameCache.make_key(encoding=self.encoding,
+                                        separator=self.separator,
+                                        header=self.header,
+                                        comment=self.comment,
+                                        skip_blank_lines=self.skip_blank_lines)
+        if signature != self._chunks_signature:
+            self._chunks = {}
+            self._chunks_signature = signature
+
+        stamps = {}
+        for file in self.files:
+            stat = file.stat()
+            stamps[file] = stat.st_size, stat.st_mtime_ns
+
+        # group files by columns to parse: all selected columns for new or modified files, missing ones for others
+        chunks = {file: chunk for file, chunk in self._chunks.items() if file in stamps}  # drop removed files
+        to_parse = {}
+        for file in self.files:
+            if file in chunks and chunks[file][0] == stamps[file]:
+                missing_columns = tuple(col for col in usecols if col not in chunks[file][1].columns)
+            else:
+                chunks.pop(file, None)
+                missing_columns = tuple(usecols)
+            if missing_columns:
+                to_parse.setdefault(missing_columns, []).append(file)
+
+        for columns, files in to_parse.items():
+            logger.debug(f"{self} ({self.extension}): {len(columns)} column(s) to parse in {len(files)} file(s)")
+            for file, df in zip(files, self._parse_files(files, list(columns))):
+                if file in chunks:
+                    df = pd.concat([chunks[file][1], df], axis=1)
+                chunks[file] = stamps[file], df
+        self._chunks = chunks
+
+        return [self._chunks[file][1][usecols] for file in self.files]
+
+    def clear_cache(self):
+        """Removes all imported data from the cache"""
+        if self.cache_dir:
+            FrameCache(self.cache_dir, self.cache_size).clear()
+
+    def _cache_key(self, usecols: List[str]) -> str:
+        """Returns the cache key of imported data: files, import properties and selected columns"""
+        return self._import_key(usecols=usecols,
+                                index_columns=sorted(self.index_columns),
+                                compare_columns=sorted(self.compare_columns))
+
+    def _import_key(self, **selection) -> str:
+        """Returns a key of the files (path, size, modification time), import properties and selection given"""
+        files = []
+        for file in self.files:
+            stat = file.stat()
+            files.append((str(file.resolve()), stat.st_size, stat.st_mtime_ns))
+
+        return FrameCache.make_key(files=files,
+                                   encoding=self.encoding,
+                                   separator=self.separator,
+                                   header=self.header,
+                                   comment=self.comment,
+                                   skip_blank_lines=self.skip_blank_lines,
+                                   strip=self.strip,
+                                   mapping=self.mapping,
+                                   categorical_columns=sorted(self.categorical_columns),
+                                   categorical_threshold=self.categorical_threshold,
+                                   arrow_strings=self.arrow_strings,
+                                   **selection)
+
+    def _imported_columns(self, usecols: List[str]) -> Optional[pd.DataFrame]:
+        """Returns the columns of usecols in imported data, with their original names"""
+        if self.df is None:
+            return None
+        columns = {self.mapping.get(col, col): col for col in usecols if self.mapping.get(col, col) in self.df.columns}
+        return self.df[list(columns)].rename(columns=columns)
+
+    @log_time_it
+    def partition(self, directory: pathlib.Path, nb_partitions: int, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+            Imports the data by chunks of chunk_size lines and writes the lines in nb_partitions files in directory,
+            according to the hash of their key: lines with the same key are in the same partition in both sets.
+        """
+        if not self.status >= Status.READY_TO_IMPORT:
+            raise StopError(f"{self.name} n'est pas prêt pour l'import")
+
+        directory.mkdir(parents=True, exist_ok=True)
+        usecols = self._usecols()
+        logger.debug(f"{self} ({self.extension}) parsed with {self._select_engine(chunksize=chunk_size)} engine, "
+                     f"{nb_partitions} partitions")
+        for file_index, file in enumerate(self.files):
+            for chunk_index, df in enumerate(self._iter_file_chunks(file, usecols, chunk_size)):
+                partitions = pd.util.hash_array(df[ROW_KEY].to_numpy()) % nb_partitions
+                for partition, part_df in df.groupby(partitions, sort=False):
+                    part_df.to_pickle(directory / f"{partition}_{file_index}_{chunk_index}.pkl")
+
+    def read_partition(self, directory: pathlib.Path, partition: int) -> pd.DataFrame:
+        """Reads the lines of a partition written by partition(), in the order of the files"""
+        files = sorted(directory.glob(f"{partition}_*.pkl"), key=lambda f: tuple(map(int, f.stem.split("_")[1:])))
+        if not files:
+            return self.empty_frame()
+        return pd.concat((pd.read_pickle(f) for f in files), ignore_index=True, sort=False)
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """Imports the data file by file, in name order, in chunks of chunk_size lines prepared like imported data"""
+        if not self.status >= Status.READY_TO_IMPORT:
+            raise StopError(f"{self.name} n'est pas prêt pour l'import")
+
+        usecols = self._usecols()
+        logger.debug(f"{self} ({self.extension}) parsed with {self._select_engine(chunksize=chunk_size)} engine, "
+                     f"by chunks of {chunk_size} lines")
+        for file in self.files:
+            yield from self._iter_file_chunks(file, usecols, chunk_size)
+
+    def _iter_file_chunks(self, file: pathlib.Path, usecols: List[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+        """Yields the lines of a file in chunks of chunk_size lines, prepared like imported data"""
+        with contextlib.ExitStack() as stack:
+            source = stack.enter_context(open_binary(file)) if is_compressed(file) else file
+            reader = stack.enter_context(self._read_csv(source, usecols=usecols, dtype=str, chunksize=chunk_size))
+            for chunk in reader:
+                df = self._prepare(chunk)
+                df[SET_NAME] = self.name
+                yield df
+
+    def empty_frame(self) -> pd.DataFrame:
+        """Returns a frame without lines, with the columns of imported data"""
+        return self._prepare(pd.DataFrame(columns=self._usecols(), dtype=object)).assign(**{SET_NAME: self.name})
+
+    def _glob_files(self) -> Tuple[pathlib.Path, ...]:
+        """
+            Returns the files of the set, in name order (all modes read them in the same order).
+            Raises StopError if a file is found both compressed and not compressed (its lines would be imported twice)
+        """
+        patterns = [f"*.{self.extension}"] + [f"*.{self.extension}{suffix}" for suffix in COMPRESSED_SUFFIXES]
+        files = tuple(file for pattern in patterns for file in self.directory.glob(pattern))
+
+        names = set()
+        for file in files:
+            name = file.stem if is_compressed(file) else file.name
+            if name in names:
+                raise StopError(f"Le fichier {name} est présent plusieurs fois (compressé ou non) dans {self.name}")
+            names.add(name)
+        return tuple(sorted(files))
+
+    def _usecols(self) -> List[str]:
+        """
+            Returns the columns to import: selection is made on renamed columns,
+            keep the original names in file order so all engines agree
+        """
+        selected_columns = self.index_columns.union(self.compare_columns, self.display_columns)
+        return [col for col in self.original_columns if self.mapping.get(col, col) in selected_columns]
+
+    def _prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Cleans and renames imported columns, then adds the key and fingerprint columns"""
+        if self.arrow_strings:
+            df = self._to_arrow_strings(df)
+
+        df.fillna("", inplace=True)
 
         if self.mapping:
             # rename df columns
-            self.df.rename(columns=self.mapping, inplace=True)
+            df.rename(columns=self.mapping, inplace=True)
 
-        # set index (sort columns alphabetically in case both sets columns are not in same order
-        sorted_index_cols = sorted(list(self.index_columns))
-        self.df[NEW_INDEX] = self.df[sorted_index_cols].apply(lambda args: "-".join(args), axis=1)
+        for column in self._categorical_columns(df):
+            df[column] = df[column].astype("category")
 
-        self.df[SET_NAME] = self.name
+        if self.strip:
+            # remove whitespace, one vectorized operation per imported column
+            for column in df.columns:
+                df[column] = strip_values(df[column])
+
+        # set key (sort columns alphabetically in case both sets columns are not in same order)
+        df[ROW_KEY] = self._make_key(df)
+
+        # hash compare columns (sorted, same order in both sets) so identical lines are found comparing integers
+        df[FINGERPRINT] = pd.util.hash_pandas_object(df[sorted(self.compare_columns)], index=False)
+        return df
+
+    @staticmethod
+    def _to_arrow_strings(df: pd.DataFrame) -> pd.DataFrame:
+        """Converts string columns that are not held in arrow arrays (parsed by pandas engines, read from cache)"""
+        return df.astype({col: ARROW_STRING_DTYPE for col, dtype in df.dtypes.items()
+                          if dtype == object or (isinstance(dtype, pd.StringDtype) and dtype.storage != "pyarrow")})
+
+    def _categorical_columns(self, df: pd.DataFrame) -> List[str]:
+        """Returns the columns stored as categoricals: selected ones, and those with few distinct values in a sample"""
+        columns = [col for col in df.columns if col in self.categorical_columns]
+        if self.categorical_threshold is not None and df.shape[0]:
+            sample = df.sample(min(df.shape[0], CATEGORICAL_SAMPLE_SIZE), random_state=0)
+            columns += [col for col in df.columns if col not in self.categorical_columns and
+                        sample[col].nunique() <= self.categorical_threshold * sample.shape[0]]
+        return columns
+
+    def estimate_memory_usage(self) -> int:
+        """
+            Estimates the memory (bytes) that imported data will use, from the size of the selected columns in files
+            (decompressed size for compressed files)
+        """
+        selected_columns = self.index_columns.union(self.compare_columns, self.display_columns)
+        selected_ratio = len(selected_columns) / max(len(self.renamed_columns), 1)
+        files_size = sum(decompressed_size(file) for file in self.files)
+        return int(files_size * selected_ratio * PARSED_MEMORY_FACTOR)
+
+    def release_columns(self, keep: Set[str]):
+        """Drops imported columns that are not in keep, data must be imported again before next comparison"""
+        self.df.drop(columns=[col for col in self.df.columns if col not in keep], inplace=True)
+        self.force_status(min(self.status, Status.READY_TO_IMPORT))
+
+    def _make_key(self, df: pd.DataFrame) -> pd.Series:
+        """Joins the index columns into the key identifying each line"""
+        sorted_index_cols = sorted(self.index_columns)
+        for column in sorted_index_cols:
+            if df[column].str.contains(KEY_SEPARATOR, regex=False).any():
+                raise StopError(f"La colonne index {column} contient un caractère non autorisé dans {self.name}")
+
+        if self.arrow_strings:
+            # joined by arrow, values are not converted to python strings
+            from pyarrow import array, compute
+            columns = (array(df[column].astype(ARROW_STRING_DTYPE, copy=False).array) for column in sorted_index_cols)
+            keys = compute.binary_join_element_wise(*columns, KEY_SEPARATOR)
+            return pd.Series(pd.arrays.ArrowStringArray(keys), index=df.index)
+
+        # keys are strings even for a categorical index column: categorical keys would be sorted by codes
+        first, *others = (df[column] for column in sorted_index_cols)
+        return first.str.cat(others, sep=KEY_SEPARATOR) if others else first.astype(object)
+
+    @staticmethod
+    def readable_id(keys: pd.Series) -> pd.Series:
+        """Converts keys to ids for display"""
+        return keys.str.replace(KEY_SEPARATOR, ID_SEPARATOR, regex=False)
+
+    def _read_columns(self, file: pathlib.Path) -> Tuple[str, ...]:
+        """Returns the columns of a file, from the header cache or by reading the beginning of the file"""
+        stat = file.stat()
+        signature = FrameCache.make_key(size=stat.st_size,
+                                        mtime=stat.st_mtime_ns,
+                                        encoding=self.encoding,
+                                        separator=self.separator,
+                                        header=self.header,
+                                        comment=self.comment,
+                                        skip_blank_lines=self.skip_blank_lines)
+        columns = header_cache.get(file.resolve(), signature)
+        if columns is None:
+            columns = self._sniff_columns(file)
+            header_cache.set(file.resolve(), signature, columns)
+        return columns
+
+    def _sniff_columns(self, file: pathlib.Path) -> Tuple[str, ...]:
+        """Reads the columns in the complete lines at the beginning of a file, or in the whole file if needed"""
+        if self.memory_map and not is_compressed(file) and file.stat().st_size:
+            # pages read here are shared with the memory map used to import the file
+            with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                head = mapped[:HEADER_SNIFF_SIZE]
+        else:
+            with open_binary(file) as f:
+                head = f.read(HEADER_SNIFF_SIZE)
+
+        if len(head) == HEADER_SNIFF_SIZE:
+            head = head[:head.rfind(b"\n") + 1]  # last line may be truncated
+        try:
+            columns = self._read_csv(io.StringIO(head.decode(self.encoding)), nrows=0).columns
+        except ValueError:  # header is further than the first bytes (parser errors are ValueError)
+            try:
+                columns = self._read_csv(file, nrows=0).columns
+            except ValueError as e:
+                raise StopError(f"Impossible de lire les colonnes de {file.name} ({self.name}) : {e}")
+        return tuple(columns.tolist())
 
-        self.status = Status.DATA_IMPORTED
+    @log_time_it
+    def _read_file(self, file, usecols):
+        """Reads the selected columns of a csv file as strings"""
+        return self._read_csv(file, usecols=usecols, dtype=str)
+
+    def _engine_supported(self, engine: str, nrows=None, chunksize=None) -> bool:
+        """Checks if the parser engine can handle the csv set properties"""
+        if engine == "python":
+            return True
+
+        single_char_sep = len(self.separator) == 1
+        if engine == "c":
+            # without skipping blank lines, the c engine drops a comment line following a blank line
+            return ((single_char_sep or self.separator == r"\s+") and
+                    (not self.comment or (len(self.comment) == 1 and self.skip_blank_lines)))
+
+        # pyarrow: no comment, no row limit or chunks, utf-8 only, and header/blank lines must be counted the same way
+        return (PYARROW_AVAILABLE and
+                single_char_sep and
+                not self.comment and
+                nrows is None and
+                chunksize is None and
+                self.header == 0 and
+                self.skip_blank_lines and
+                codecs.lookup(self.encoding).name == "utf-8")
+
+    def _select_engine(self, nrows=None, chunksize=None, after=None) -> str:
+        """
+            Returns the fastest parser engine allowed by the engine setting and the csv set properties
+            (slower than engine after if it is given)
+        """
+        if self.engine == ENGINE_AUTO:
+            candidates = PARSER_ENGINES
+        else:
+            candidates = PARSER_ENGINES[PARSER_ENGINES.index(self.engine):]
+        if after is not None:
+            candidates = candidates[candidates.index(after) + 1:]
+        return next(engine for engine in candidates if self._engine_supported(engine, nrows, chunksize))
+
+    def _read_csv(self, file, usecols=None, nrows=None, na_values=None, dtype=None, header=None, chunksize=None):
+        """Reads a csv file, or returns a reader of chunks of chunksize lines (file must stay open while it is used)"""
+        if isinstance(file, pathlib.Path) and is_compressed(file) and chunksize is None:
+            # decompressed while parsing
+            with open_binary(file) as f:
+                return self._read_csv(f, usecols=usecols, nrows=nrows, na_values=na_values, dtype=dtype, header=header)
+
+        engine = self._select_engine(nrows, chunksize)
+        if engine == "pyarrow":
+            from pyarrow import ArrowException
+            try:
+                return self._read_csv_pyarrow(file, usecols=usecols, na_values=na_values, dtype=dtype)
+            except ArrowException as e:
+                # pyarrow refuses lines pandas accepts (missing trailing fields, whitespace only lines)
+                engine = self._select_engine(nrows, chunksize, after="pyarrow")
+                logger.info(f"{self} ({self.extension}) parsed again with {engine} engine, pyarrow failed: {e}")
+                if not isinstance(file, pathlib.Path):
+                    file.seek(0)
 
-    def _read_csv(self, file, usecols=None, nrows=None, na_values=None, dtype=None):
         return pd.read_csv(file,
-                           engine="python",
+                           engine=engine,
                            index_col=False,
-                           usecols=usecols,
+                           usecols=list(usecols) if usecols is not None else None,
                            na_values=na_values,
-                           dtype=dtype,
+                           dtype=ARROW_STRING_DTYPE if dtype is str and self.arrow_strings else dtype,
                            encoding=self.encoding,
                            sep=self.separator,
-                           header=self.header,
+                           header=self.header if header is None else header,
                            comment=self.comment,
                            skip_blank_lines=self.skip_blank_lines,
-                           nrows=nrows)
+                           memory_map=self.memory_map and isinstance(file, pathlib.Path),
+                           nrows=nrows,
+                           chunksize=chunksize)
+
+    def _read_csv_pyarrow(self, file, usecols=None, na_values=None, dtype=None):
+        """
+            Reads a csv file with pyarrow directly: pandas' pyarrow engine converts dtype after parsing,
+            which turns empty columns into "None" strings. Null values are the same as pandas defaults.
+        """
+        from pyarrow import csv, string, memory_map
+
+        null_values = sorted(STR_NA_VALUES.union(na_values or []))
+        column_types = {col: string() for col in usecols or self.original_columns} if dtype is str else None
+        with contextlib.ExitStack() as stack:
+            if self.memory_map and isinstance(file, pathlib.Path):
+                file = stack.enter_context(memory_map(str(file)))  # parsed values are copied, map is closed after
+            table = csv.read_csv(file,
+                                 parse_options=csv.ParseOptions(delimiter=self.separator,
+                                                                ignore_empty_lines=self.skip_blank_lines),
+                                 convert_options=csv.ConvertOptions(include_columns=usecols,
+                                                                    column_types=column_types,
+                                                                    null_values=null_values,
+                                                                    strings_can_be_null=True))
+        if self.arrow_strings:
+            return table.to_pandas(types_mapper={string(): pd.StringDtype("pyarrow")}.get)
+        return table.to_pandas()
@@ -0,0 +1,152 @@
+import logging
+import pathlib
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from api.csv_manager import CsvManager
+from api.result_lines import ResultLines
+from api.utils.constants import DEFAULT_EXPORT_BATCH, EXCEL_MAX_ROWS
+from api.utils.exceptions import StopError
+
+logger = logging.getLogger(__name__)
+
+# kinds of result lines: CsvManager properties giving them by extension
+RESULT_KINDS = ("differences", "in_one", "not_compared")
+
+
+class CsvExporter:
+    """Writes each kind of result lines of an extension in a csv file"""
+    suffix = ".csv"
+
+    def __init__(self, directory: pathlib.Path, extension: str):
+        self._directory = directory
+        self._extension = extension
+        self._file = None
+        self.paths: List[pathlib.Path] = []
+
+    def start(self, kind: str, columns: List[str]):
+        self.close()
+        path = self._directory / f"{self._extension}_{kind}{self.suffix}"
+        self._file = open(path, "w", encoding="utf8", newline="")
+        self._file.write(pd.DataFrame(columns=columns).to_csv(index=False))
+        self.paths.append(path)
+
+    def write(self, df: pd.DataFrame):
+        df.to_csv(self._file, header=False, index=False)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class ParquetExporter(CsvExporter):
+    """Writes each kind of result lines of an extension in a parquet file, one row group per batch"""
+    suffix = ".parquet"
+
+    def start(self, kind: str, columns: List[str]):
+        try:
+            import pyarrow as pa
+            from pyarrow import parquet
+        except ModuleNotFoundError:
+            raise StopError("Le module pyarrow est nécessaire pour exporter en parquet")
+
+        self.close()
+        path = self._directory / f"{self._extension}_{kind}{self.suffix}"
+        self._file = parquet.ParquetWriter(path, pa.schema([(col, pa.string()) for col in columns]))
+        self.paths.append(path)
+
+    def write(self, df: pd.DataFrame):
+        import pyarrow as pa
+        self._file.write_table(pa.Table.from_pandas(df, schema=self._file.schema, preserve_index=False))
+
+
+class ExcelExporter:
+    """
+        Writes the result lines of an extension in an xlsx workbook, a sheet for each kind of lines.
+        Rows are written one by one and flushed (constant memory), sheets are split at the excel row limit.
+    """
+    suffix = ".xlsx"
+
+    def __init__(self, directory: pathlib.Path, extension: str):
+        try:
+            import xlsxwriter
+        except ModuleNotFoundError:
+            raise StopError("Le module xlsxwriter est nécessaire pour exporter en Excel")
+
+        path = directory / f"{extension}{self.suffix}"
+        self._workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "strings_to_numbers": False})
+        self._sheet = None
+        self._kind = None
+        self._columns = None
+        self._nb_sheets = 0
+        self._row = 0
+        self.paths = [path]
+
+    def start(self, kind: str, columns: List[str]):
+        self._kind = kind
+        self._columns = columns
+        self._nb_sheets = 0
+        self._add_sheet()
+
+    def write(self, df: pd.DataFrame):
+        for values in df.itertuples(index=False, name=None):
+            if self._row == EXCEL_MAX_ROWS:
+                self._add_sheet()
+            self._sheet.write_row(self._row, 0, values)
+            self._row += 1
+
+    def close(self):
+        self._workbook.close()
+
+    def _add_sheet(self):
+        """Adds a sheet for the current kind of lines, with the header"""
+        self._nb_sheets += 1
+        name = self._kind if self._nb_sheets == 1 else f"{self._kind} ({self._nb_sheets})"
+        self._sheet = self._workbook.add_worksheet(name)
+        self._sheet.write_row(0, 0, self._columns)
+        self._row = 1
+
+
+EXPORTERS = {"csv": CsvExporter, "parquet": ParquetExporter, "xlsx": ExcelExporter}
+
+
+def export_results(manager: CsvManager,
+                   directory: pathlib.Path,
+                   file_format: str = "csv",
+                   batch_size: int = DEFAULT_EXPORT_BATCH,
+                   progress: Optional[Callable[[int, int], None]] = None) -> List[pathlib.Path]:
+    """
+        Writes the differences, lines in one set only and lines not compared of each extension, built and written
+        batch by batch. progress is called after each batch with the number of lines written and the total.
+        Returns the files written.
+    """
+    if file_format not in EXPORTERS:
+        raise StopError(f"Format d'export inconnu: {file_format}")
+    if manager.results is None:
+        raise StopError("Aucun résultat à exporter")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    kinds = {kind: getattr(manager, kind) for kind in RESULT_KINDS}
+    total = sum(sum(frames.counts().values()) for frames in kinds.values())
+    done = 0
+
+    paths = []
+    for extension in manager.results:
+        exporter = EXPORTERS[file_format](directory, extension)
+        try:
+            for kind, frames in kinds.items():
+                lines: ResultLines = frames.lines(extension)
+                exporter.start(kind, lines.page(0, 0).columns.tolist())
+                for batch in lines.iter_batches(batch_size):
+                    exporter.write(batch)
+                    done += batch.shape[0]
+                    if progress:
+                        progress(done, total)
+        finally:
+            exporter.close()
+        paths.extend(exporter.paths)
+
+    logger.info(f"{done} result lines exported to {directory} ({file_format})")
+    return paths
@@ -1,4 +1,4 @@
-from typing import Optional, Tuple, Iterable
+from typing import Optional, Tuple, Iterable, Dict
 
 
 class Result:
@@ -24,8 +24,25 @@ class Result:
         # nb of differences in lines that could be compared
         self.nb_differences: Optional[int] = None
 
+        # nb of differences in each compared column
+        self.nb_differences_by_column: Optional[Dict[str, int]] = None
+
         # -> short text conclusion of the comparison
         self.conclusion: str = ""
 
         # -> detailled results of the comparison
         self.details: Iterable[str] = tuple()
+
+    def add_counts(self, other: "Result"):
+        """Adds the line and difference counts of another result (comparison of another subset of lines)"""
+        for attr in ("nb_in_one", "nb_in_both", "nb_not_comparable"):
+            counts = getattr(self, attr) or (0, 0)
+            setattr(self, attr, tuple(a + b for a, b in zip(counts, getattr(other, attr))))
+
+        for attr in ("nb_with_differences", "nb_identical", "nb_differences"):
+            setattr(self, attr, (getattr(self, attr) or 0) + getattr(other, attr))
+
+        counts = dict(self.nb_differences_by_column or {})
+        for column, count in (other.nb_differences_by_column or {}).items():
+            counts[column] = counts.get(column, 0) + count
+        self.nb_differences_by_column = counts
@@ -0,0 +1,99 @@
+from typing import Callable, Dict, Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+from pandas._typing import ArrayLike
+
+from api.utils.constants import NEW_INDEX, ROW_KEY
+from api.csv_set import CsvSet
+
+
+def for_display(df: pd.DataFrame) -> pd.DataFrame:
+    """Replaces the key by the readable id and converts categorical and arrow columns to python strings"""
+    df = df.reset_index(drop=True)
+    df.insert(0, NEW_INDEX, CsvSet.readable_id(df.pop(ROW_KEY)))
+    return df.astype({col: object for col, dtype in df.dtypes.items()
+                      if isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype))})
+
+
+class ResultLines:
+    """
+        Lines of a comparison result, built from the compared data when they are read.
+        Lines are made from units (a line of a set, or a line with differences in both sets), sorted by key
+        (keeping the order of units with the same key). Counts are known at once, lines are built by pages or batches.
+    """
+
+    def __init__(self, keys: ArrayLike, sizes: np.ndarray, build: Callable[[np.ndarray], pd.DataFrame]):
+        self._keys = keys  # key of each unit
+        self._sizes = sizes  # number of result lines of each unit
+        self._build = build  # returns the result lines (with key) of units at given positions, in the same order
+        self._order = None  # positions of units sorted by key
+        self._ends = None  # number of result lines up to each sorted unit (included)
+        self._frame = None  # all result lines, once built
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ResultLines":
+        """Result lines already built, with their key. Lines are sorted when they are read"""
+        return cls(df[ROW_KEY].array, np.ones(df.shape[0], dtype=np.intp), df.take)
+
+    def __len__(self):
+        return int(self._sizes.sum())
+
+    def page(self, number: int, size: int) -> pd.DataFrame:
+        """Returns the lines of page number (from 0), in pages of size lines"""
+        return self._lines(number * size, (number + 1) * size)
+
+    def iter_batches(self, size: int) -> Iterator[pd.DataFrame]:
+        """Yields all lines by batches of size lines"""
+        for start in range(0, len(self), size):
+            yield self._lines(start, start + size)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Returns all lines, built once"""
+        if self._frame is None:
+            self._frame = self._lines(0, len(self))
+        return self._frame
+
+    def unsorted_frame(self) -> pd.DataFrame:
+        """Returns all lines with their key, in the order of units"""
+        return self._build(np.arange(self._sizes.shape[0]))
+
+    def materialized(self) -> "ResultLines":
+        """Returns the same lines, built, without reference to the compared data"""
+        return ResultLines.from_frame(self.unsorted_frame())
+
+    def _lines(self, start: int, stop: int) -> pd.DataFrame:
+        """Returns lines from start to stop (excluded) in key order"""
+        if self._order is None:
+            self._order = self._keys.argsort(kind="stable")
+            self._ends = np.cumsum(self._sizes[self._order])
+
+        # units with lines in the range, then lines of the first and last units outside the range
+        first = np.searchsorted(self._ends, start, side="right")
+        last = np.searchsorted(self._ends, stop, side="left") + 1
+        df = self._build(self._order[first:last])
+        skipped = start - (self._ends[first - 1] if first else 0)
+        return for_display(df.iloc[skipped:skipped + max(stop - start, 0)])
+
+
+class ResultFrames(Mapping):
+    """Result lines by extension, built as DataFrames when they are accessed"""
+
+    def __init__(self, lines: Dict[str, ResultLines]):
+        self._lines = lines
+
+    def __getitem__(self, extension: str) -> pd.DataFrame:
+        return self._lines[extension].to_frame()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._lines)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def lines(self, extension: str) -> ResultLines:
+        return self._lines[extension]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of lines by extension, without building them"""
+        return {extension: len(lines) for extension, lines in self._lines.items()}
@@ -0,0 +1,154 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import pathlib
+import re
+import threading
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from api.utils.constants import home_dir
+
+logger = logging.getLogger(__name__)
+
+# increase when the content of cached dataframes changes
+CACHE_VERSION = 1
+
+# feather (arrow columnar format) needs pyarrow, pickle is used without it
+FEATHER_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+CACHE_SUFFIX = ".feather" if FEATHER_AVAILABLE else ".pkl"
+
+# per user: the bundle directory is read only or temporary once frozen
+HEADER_CACHE_PATH = home_dir / ".bulkompare" / "headers.json"
+
+# cache entries are named by their key (sha256 hex digest), other files of the directory are never touched
+ENTRY_NAME = re.compile(r"[0-9a-f]{64}\.(feather|pkl)")
+
+
+class FrameCache:
+    """On disk cache of dataframes, with least recently used entries evicted above max_size (bytes)"""
+
+    def __init__(self, directory: pathlib.Path, max_size: int):
+        self.directory = directory
+        self.max_size = max_size
+
+    @staticmethod
+    def make_key(**properties) -> str:
+        """Returns a key identifying the properties (must be json serializable)"""
+        dump = json.dumps({"version": CACHE_VERSION, **properties}, sort_keys=True, default=str)
+        return hashlib.sha256(dump.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Returns the cached dataframe, None if it is not in cache"""
+        path = self._path(key)
+        if not path.is_file():
+            return None
+
+        try:
+            df = pd.read_feather(path) if FEATHER_AVAILABLE else pd.read_pickle(path)
+        except Exception as e:
+            logger.warning(f"Cache entry {path.name} can't be read, removing it ({e})")
+            path.unlink(missing_ok=True)
+            return None
+
+        os.utime(path)  # most recently used
+        logger.debug(f"Cache hit {path.name}")
+        return df
+
+    def put(self, key: str, df: pd.DataFrame):
+        """Stores the dataframe (with a default index) in cache, then evicts old entries if cache is too big"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        if FEATHER_AVAILABLE:
+            df.to_feather(tmp_path)
+        else:
+            df.to_pickle(tmp_path)
+        tmp_path.replace(path)  # never leave a partially written entry
+        logger.debug(f"Cache entry {path.name} stored")
+
+        self._evict()
+
+    def clear(self):
+        """Removes all cache entries"""
+        for path in self._entries():
+            path.unlink(missing_ok=True)
+        logger.debug(f"Cache {self.directory} cleared")
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / f"{key}{CACHE_SUFFIX}"
+
+    def _entries(self):
+        if not self.directory.is_dir():
+            return []
+        return [path for path in self.directory.iterdir() if ENTRY_NAME.fullmatch(path.name)]
+
+    def _evict(self):
+        """Removes least recently used entries until cache size is under max_size"""
+        entries = sorted(((path.stat(), path) for path in self._entries()), key=lambda entry: entry[0].st_mtime)
+        total_size = sum(stat.st_size for stat, _ in entries)
+        for stat, path in entries:
+            if total_size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= stat.st_size
+            logger.debug(f"Cache entry {path.name} evicted")
+
+
+class HeaderCache:
+    """Columns of csv files, by file path, persisted in a json file. Thread safe"""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self._headers = None  # {path: {"signature": key of file stamp and properties, "columns": [...]}}
+        self._modified = False
+        self._lock = threading.Lock()
+
+    def use(self, path: pathlib.Path):
+        """Persists the cache in another file, headers are loaded from it when they are needed"""
+        with self._lock:
+            self.path = path
+            self._headers = None
+            self._modified = False
+
+    def get(self, file: pathlib.Path, signature: str) -> Optional[Tuple[str, ...]]:
+        """Returns the columns of the file, None if the file or properties changed since they were cached"""
+        with self._lock:
+            entry = self._load().get(str(file))
+        if entry and entry["signature"] == signature:
+            return tuple(entry["columns"])
+        return None
+
+    def set(self, file: pathlib.Path, signature: str, columns: Tuple[str, ...]):
+        with self._lock:
+            self._load()[str(file)] = {"signature": signature, "columns": list(columns)}
+            self._modified = True
+
+    def save(self):
+        """Writes the cache file if some headers were added"""
+        with self._lock:
+            if not self._modified:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps(self._headers))
+                tmp_path.replace(self.path)
+                self._modified = False
+            except OSError as e:
+                logger.warning(f"Header cache can't be saved to {self.path} ({e})")
+
+    def _load(self) -> dict:
+        if self._headers is None:
+            try:
+                self._headers = json.loads(self.path.read_text()) if self.path.is_file() else {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Header cache can't be read from {self.path} ({e})")
+                self._headers = {}
+        return self._headers
+
+
+header_cache = HeaderCache(HEADER_CACHE_PATH)
@@ -1,9 +1,13 @@
 from enum import Enum
 import pathlib
 
-NEW_INDEX = "id"
+NEW_INDEX = "id"  # readable id of the lines in results (index columns values joined with ID_SEPARATOR)
+ROW_KEY = "row_key"  # key of the lines (index columns values joined with KEY_SEPARATOR)
+DIFF_COLUMN = "colonne"  # name of the compared column in differences
+ID_SEPARATOR = "-"
+FINGERPRINT = "fingerprint"  # 64 bits hash of the compare columns values of the lines
+KEY_SEPARATOR = "\x1f"  # ascii unit separator, refused in index values so keys never collide
 SET_NAME = "set"
-SET_ID = "set_id"
 home_dir = pathlib.Path.home()
 
 
@@ -32,3 +36,51 @@ DEFAULT_COMMENT = None
 DEFAULT_SKIP_BLANK = False
 DEFAULT_SEPARATOR = "\t"
 DEFAULT_STRIP = True
+
+# csv parser engines, fastest first. "auto" selects the fastest one supporting the csv set properties
+ENGINE_AUTO = "auto"
+PARSER_ENGINES = ("pyarrow", "c", "python")
+DEFAULT_ENGINE = ENGINE_AUTO
+
+# dtype of strings held in arrow arrays instead of python objects
+ARROW_STRING_DTYPE = "string[pyarrow]"
+
+# comparators run concurrently in a process pool by CsvManager
+DEFAULT_COMPARE_WORKERS = 1
+
+# files read concurrently when importing a set ("thread" or "process" pool)
+DEFAULT_WORKERS = 1
+DEFAULT_EXECUTOR = "thread"
+
+# memory taken by imported data (python strings) relative to the size of the csv files
+PARSED_MEMORY_FACTOR = 6
+
+# comparison modes: all data in memory / lines split in partitions on disk by hash of their key, compared one by one /
+# files sorted by key read in chunks and merged (memory mode if they are not sorted)
+MODE_MEMORY = "memory"
+MODE_PARTITIONED = "partitioned"
+MODE_SORTED = "sorted"
+COMPARE_MODES = (MODE_MEMORY, MODE_PARTITIONED, MODE_SORTED)
+DEFAULT_MODE = MODE_MEMORY
+DEFAULT_PARTITIONS = 16
+DEFAULT_CHUNK_SIZE = 100_000  # lines read at once from each set in sorted mode
+
+# result records yielded at once by the streaming API of comparators
+DEFAULT_BATCH_RECORDS = 10_000
+
+# result lines exported at once, and rows in an excel sheet (header included)
+DEFAULT_EXPORT_BATCH = 50_000
+EXCEL_MAX_ROWS = 1_048_576
+
+# cache of imported sets (bytes)
+DEFAULT_CACHE_SIZE = 10 * 2**30
+
+# header discovery: bytes read at the beginning of files, and files read concurrently
+HEADER_SNIFF_SIZE = 64 * 2**10
+HEADER_WORKERS = 8
+
+# many small files are parsed in batches of this size (bytes)
+BATCH_SIZE = 64 * 2**20
+
+# lines sampled to find columns with few distinct values, stored as categoricals
+CATEGORICAL_SAMPLE_SIZE = 10_000
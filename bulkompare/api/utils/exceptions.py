@@ -2,6 +2,10 @@ class StopError(Exception):
     """Stop what we are doing and report"""
 
 
+class NotSortedError(Exception):
+    """Lines of a set are not sorted by key"""
+
+
 class CustomError(Exception):
     """Raise this exception in case of problem with custom operation"""
     pass
@@ -0,0 +1,58 @@
+import bz2
+import gzip
+import lzma
+import pathlib
+from typing import BinaryIO
+
+from api.utils.exceptions import StopError
+
+# suffixes of compressed files, decompressed while they are read
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".xz", ".zst")
+
+# decompressed bytes read to estimate the compression ratio of a file
+SIZE_SAMPLE = 2**20
+
+
+def is_compressed(path: pathlib.Path) -> bool:
+    return path.suffix in COMPRESSED_SUFFIXES
+
+
+def open_binary(path: pathlib.Path) -> BinaryIO:
+    """Opens a file for reading bytes, decompressing it on the fly if it is compressed"""
+    if is_compressed(path):
+        return _decompress(path, path)
+    return open(path, "rb")
+
+
+def decompressed_size(path: pathlib.Path) -> int:
+    """
+        Returns the size of a file once decompressed: exact for small compressed files, estimated for others
+        from the compression ratio of their first bytes
+    """
+    size = path.stat().st_size
+    if not is_compressed(path):
+        return size
+
+    with open(path, "rb") as raw, _decompress(path, raw) as f:
+        decompressed = 0
+        while decompressed < SIZE_SAMPLE:
+            block = f.read(SIZE_SAMPLE)
+            if not block:
+                return decompressed
+            decompressed += len(block)
+        return int(decompressed * size / max(raw.tell(), 1))
+
+
+def _decompress(path: pathlib.Path, source) -> BinaryIO:
+    """Opens a decompressing reader of source (path or binary file), according to the suffix of path"""
+    if path.suffix == ".gz":
+        return gzip.open(source, "rb")
+    if path.suffix == ".bz2":
+        return bz2.open(source, "rb")
+    if path.suffix == ".xz":
+        return lzma.open(source, "rb")
+    try:
+        import zstandard
+    except ModuleNotFoundError:
+        raise StopError(f"Le module zstandard est nécessaire pour lire {path.name}")
+    return zstandard.open(source, "rb")
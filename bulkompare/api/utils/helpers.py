@@ -1,14 +1,33 @@
+import functools
 import logging
+import pathlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from time import perf_counter
 
 logger = logging.getLogger(__name__)
 
+EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
 
 def log_time_it(func):
+    @functools.wraps(func)
     def timed(*args, **kw):
         t0 = perf_counter()
         res = func(*args, **kw)
         t1 = perf_counter()
-        logger.debug(f"{func.__name__} done (in {round(t1-t0, 2)}s)")
+        # name the file when the function works on one
+        path = next((arg for arg in args if isinstance(arg, pathlib.PurePath)), None)
+        target = f" ({path.name})" if path else ""
+        logger.debug(f"{func.__name__}{target} done (in {round(t1-t0, 2)}s)")
         return res
     return timed
+
+
+def parallel_map(func, items, workers: int = 1, executor: str = "thread") -> list:
+    """Applies func to each item in a thread or process pool, results are in the same order as items"""
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    with EXECUTORS[executor](max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(func, items))
@@ -1,8 +1,11 @@
 import logging
+import pathlib
 
 from PySide2 import QtCore, QtWidgets
 
 from api.csv_manager import CsvManager
+from api.export import export_results
+from api.utils.exceptions import StopError
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +14,8 @@ class Worker(QtCore.QObject):
     finished = QtCore.Signal()
     success = QtCore.Signal()
     error = QtCore.Signal()
+    progress = QtCore.Signal(int, int)
+    error_message = QtCore.Signal(str)
 
     def __init__(self, manager: CsvManager):
         super().__init__()
@@ -40,3 +45,19 @@ class Worker(QtCore.QObject):
 
         finally:
             self.finished.emit()
+
+    def export(self, directory: pathlib.Path, file_format: str):
+        try:
+            export_results(self._manager, directory, file_format, progress=self.progress.emit)
+
+        except StopError as e:
+            logger.warning(e)
+            self.error_message.emit(str(e))
+        except Exception as e:
+            logger.exception(f"unexpected exception: {e}")
+            self.error_message.emit(f"Erreur pendant l'export : {e}")
+        else:
+            self.success.emit()
+
+        finally:
+            self.finished.emit()
@@ -0,0 +1,129 @@
+"""
+Compares the data sets of a selection file (as saved by the app) without the graphical interface.
+
+    python bulkompare/cli.py selection.json --directories dir_a dir_b --output results --format xlsx
+
+Writes summary.json (counts and conclusions by extension) and the result lines in the output directory.
+Exit code is 0 when all sets are identical, 1 when differences or lines not compared are found, 2 on error.
+"""
+import argparse
+import json
+import logging
+import pathlib
+import sys
+from typing import List, Optional
+
+from api.csv_manager import CsvManager
+from api.export import EXPORTERS, export_results
+from api.result import Result
+from api.utils.constants import COMPARE_MODES
+from api.utils.exceptions import StopError
+from api.utils.helpers import EXECUTORS
+
+logger = logging.getLogger(__name__)
+
+EXIT_IDENTICAL = 0
+EXIT_DIFFERENT = 1
+EXIT_ERROR = 2
+
+SUMMARY_FILE = "summary.json"
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="bulkompare", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("selection", type=pathlib.Path, help="selection file (json)")
+    parser.add_argument("--directories", nargs=2, type=pathlib.Path, metavar=("DIR_A", "DIR_B"),
+                        help="directories of the sets, instead of the ones of the selection")
+    parser.add_argument("--names", nargs=2, metavar=("NAME_A", "NAME_B"),
+                        help="names of the sets, instead of the ones of the selection")
+    parser.add_argument("--output", type=pathlib.Path, default=pathlib.Path("."),
+                        help="directory of the summary and result files")
+    parser.add_argument("--format", choices=EXPORTERS, default="csv", help="format of the result files")
+    parser.add_argument("--no-export", action="store_true", help="only write the summary")
+    parser.add_argument("--workers", type=int, help="extensions compared concurrently")
+    parser.add_argument("--set-workers", type=int, help="files of a set read concurrently")
+    parser.add_argument("--executor", choices=EXECUTORS, help="pool used to read files concurrently")
+    parser.add_argument("--cache-dir", type=pathlib.Path, help="directory of parsed data kept between runs")
+    parser.add_argument("--mode", choices=COMPARE_MODES, help="how lines are brought together to be compared")
+    parser.add_argument("--verbose", "-v", action="count", default=0)
+    return parser.parse_args(args)
+
+
+def configure(manager: CsvManager, args: argparse.Namespace):
+    """Applies the sources and the options of the command line to the selection"""
+    if args.directories or args.names:
+        manager.update_sources(names=args.names or manager.names,
+                               directories=args.directories or manager.directories,
+                               extensions=[comp.extension for comp in manager.comparators])
+
+    if args.workers is not None:
+        manager.workers = args.workers
+
+    for comparator in manager.comparators:
+        if args.mode:
+            comparator.mode = args.mode
+        for csv_set in comparator.csv_sets:
+            if args.set_workers is not None:
+                csv_set.workers = args.set_workers
+            if args.executor:
+                csv_set.executor = args.executor
+            if args.cache_dir:
+                csv_set.cache_dir = args.cache_dir
+
+
+def summarize(result: Result) -> dict:
+    """Counts and conclusions of the comparison of an extension"""
+    return {"conclusion": result.conclusion,
+            "details": list(result.details),
+            "nb_in_one": result.nb_in_one,
+            "nb_in_both": result.nb_in_both,
+            "nb_not_comparable": result.nb_not_comparable,
+            "nb_with_differences": result.nb_with_differences,
+            "nb_identical": result.nb_identical,
+            "nb_differences": result.nb_differences,
+            "nb_differences_by_column": result.nb_differences_by_column}
+
+
+def is_identical(result: Result) -> bool:
+    return not (result.nb_with_differences or any(result.nb_in_one) or any(result.nb_not_comparable))
+
+
+def run(args: argparse.Namespace) -> int:
+    """Compares the sets of the selection, writes summary and result files. Returns the exit code"""
+    manager = CsvManager.parse_file(args.selection)
+    configure(manager, args)
+    for comparator in manager.comparators:
+        comparator.upgrade_status()  # raises the reason why a set can't be imported
+    manager.compare()
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    files = [] if args.no_export else export_results(manager, args.output, args.format)
+    summary = {"names": manager.names,
+               "directories": [str(directory) for directory in manager.directories],
+               "results": {extension: summarize(result) for extension, result in manager.results.items()},
+               "files": [path.name for path in files]}
+    with open(args.output / SUMMARY_FILE, "w", encoding="utf8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    for extension, result in manager.results.items():
+        logger.info(f"{extension}: {result.conclusion}")
+
+    if all(is_identical(result) for result in manager.results.values()):
+        return EXIT_IDENTICAL
+    return EXIT_DIFFERENT
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    args = parse_args(args)
+    logging.basicConfig(level=(logging.WARNING, logging.INFO, logging.DEBUG)[min(args.verbose, 2)],
+                        format="%(levelname)s - %(message)s  (%(name)s.%(funcName)s)")
+    try:
+        return run(args)
+    except (StopError, OSError, ValueError) as e:
+        logger.error(str(e))
+        return EXIT_ERROR
+
+
+if __name__ == '__main__':
+    sys.exit(main())
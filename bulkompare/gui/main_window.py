@@ -112,6 +112,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self._ui.actionSelectColumns.triggered.connect(self._select_columns_clicked)
         self._ui.actionSelectMapping.triggered.connect(self._select_mapping_clicked)
         self._ui.actionCompare.triggered.connect(self._compare)
+        self._ui.actionExportExcel.triggered.connect(self._export_excel)
         self._ui.actionToggleFilter.triggered.connect(self._toggle_filter)
         self._ui.actionLoadSelection.triggered.connect(self._load_selections)
         self._ui.actionSaveSelection.triggered.connect(self._save_selections)
@@ -176,12 +177,37 @@ class MainWindow(QtWidgets.QMainWindow):
         self._update_ui()
         self._display_main_area(logo=False, animate=False)
 
+    def _export_excel(self):
+        """Exports the results to xlsx workbooks (one per extension) in a new thread"""
+        path_str = QtWidgets.QFileDialog.getExistingDirectory(self, "Exporter les résultats",
+                                                              str(self._config.selections_dir))
+        if not path_str:
+            return
+
+        self._lock_ui()
+
+        self.thread = QtCore.QThread(self)
+        self.worker = Worker(manager=self._manager)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(lambda: self.worker.export(pathlib.Path(path_str), "xlsx"))
+        self.worker.progress.connect(self._export_progress)
+        self.worker.success.connect(lambda: self._set_status_bar_right_text("Export terminé"))
+        self.worker.error_message.connect(self._show_error_dialog)
+        self.worker.finished.connect(self.thread.quit)
+        self.worker.finished.connect(self._update_ui)
+        self.thread.start()
+
+    def _export_progress(self, done: int, total: int):
+        """Callback after each batch of exported lines"""
+        self._ui.statusBar.showMessage(f"Export : {done} / {total} lignes")
+
     def _lock_ui(self):
         """Disable actions while worker is busy"""
         self._ui.actionSelectProperties.setEnabled(False)
         self._ui.actionSelectColumns.setEnabled(False)
         self._ui.actionSelectMapping.setEnabled(False)
         self._ui.actionCompare.setEnabled(False)
+        self._ui.actionExportExcel.setEnabled(False)
         self._ui.actionToggleFilter.setEnabled(False)
 
     def _select_columns_clicked(self):
@@ -318,6 +344,8 @@ class MainWindow(QtWidgets.QMainWindow):
 
         logger.debug("Update UI with " + str(status))
 
+        self._ui.actionExportExcel.setEnabled(self._manager.results is not None)
+
         if status == Status.DATA_IMPORTED:
             self._set_action_status(ActionStatus.DISABLED, action=self._ui.actionCompare)
             self._reset_filter(allow=True)
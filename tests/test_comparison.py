@@ -1,21 +1,66 @@
+import contextlib
+import gzip
+import json
+import pathlib
+import re
+import shutil
+import sys
+import tempfile
 import unittest
+import zipfile
+from typing import Dict, List, Optional
+from unittest import mock
 
 import pandas as pd
 from pandas.testing import assert_frame_equal
 
 from bulkompare.api.csv_manager import CsvManager
+from bulkompare import cli
+from api import export
+from api.csv_set import CsvSet
+from api.utils.cache import header_cache
+from api.utils.constants import HEADER_SNIFF_SIZE, Status
+from api.utils.exceptions import StopError
 
 
 class TestComparison(unittest.TestCase):
 
     def setUp(self) -> None:
+        # headers of test files are cached in a temporary file
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.addCleanup(header_cache.use, header_cache.path)
+        header_cache.use(pathlib.Path(cache_dir.name) / "headers.json")
+
         self.manager = CsvManager.parse_file("data/selection.json")
 
+    def _compare(self) -> List[Dict[str, pd.DataFrame]]:
+        """Compares the sets, returns the differences, lines in one set and lines not compared by extension"""
+        self.manager.upgrade_status_silently()
+        self.manager.compare()
+        return [dict(frames) for frames in (self.manager.differences, self.manager.in_one, self.manager.not_compared)]
+
+    def assert_results_equal(self, expected: List[Dict[str, pd.DataFrame]], results: List[Dict[str, pd.DataFrame]]):
+        for expected_frames, frames in zip(expected, results):
+            self.assertEqual(expected_frames.keys(), frames.keys())
+            for extension, df in frames.items():
+                assert_frame_equal(expected_frames[extension], df)
+
     def test_comparison(self):
 
         self.manager.upgrade_status_silently()
         self.manager.compare()
 
+        # check *.tsv counts
+        result = self.manager.results["tsv"]
+        self.assertEqual((1, 0), result.nb_in_one)
+        self.assertEqual((4, 4), result.nb_in_both)
+        self.assertEqual((2, 2), result.nb_not_comparable)
+        self.assertEqual(1, result.nb_with_differences)
+        self.assertEqual(1, result.nb_identical)
+        self.assertEqual(2, result.nb_differences)
+        self.assertEqual({"Empty": 1, "Val1": 0, "Val2": 0, "Val3": 1}, result.nb_differences_by_column)
+
         # check *.tsv differences (Empty and Val3 changed for Jane)
         expected = pd.DataFrame({
             "id": ["02/01/2021-Jane-08:20:23", "02/01/2021-Jane-08:20:23"],
@@ -61,3 +106,451 @@ class TestComparison(unittest.TestCase):
 
         # check *.other not_compared (nothing)
         self.assertTrue(self.manager.not_compared["other"].empty)
+
+    def test_paged_results(self):
+        # pages and batches of result lines are the lines of the full results, in the same order
+        self.manager.upgrade_status_silently()
+        self.manager.compare()
+        comparator = self.manager.comparators[0]
+        self.assertEqual({"tsv": 2, "other": 1}, self.manager.differences.counts())
+
+        for lines in (comparator.differences_lines, comparator.in_one_lines, comparator.not_compared_lines):
+            expected = lines.to_frame()
+            pages = [lines.page(number, 1) for number in range(len(lines))]
+            assert_frame_equal(expected, pd.concat(pages, ignore_index=True))
+            assert_frame_equal(expected, pd.concat(lines.iter_batches(3), ignore_index=True))
+            self.assertTrue(lines.page(len(lines), 1).empty)
+
+    def test_streamed_results(self):
+        # records streamed by batches are the lines of the results, counts are the same
+        self.manager.upgrade_status_silently()
+        comparator = self.manager.comparators[0]
+        comparator.compare()
+        expected = [list(df.itertuples(index=False, name=None))
+                    for df in (comparator.differences_in_common_lines, comparator.in_one, comparator.not_compared)]
+
+        for mode in ("memory", "sorted", "partitioned"):
+            comparator.mode = mode
+            for records, iterate in zip(expected, (comparator.iter_differences, comparator.iter_in_one,
+                                                   comparator.iter_not_compared)):
+                batches = list(iterate(batch_size=1))
+                self.assertTrue(all(len(batch) == 1 for batch in batches))
+                self.assertEqual(sorted(records), sorted(record for batch in batches for record in batch))
+                self.assertEqual((4, 4), comparator.result.nb_in_both)
+        self.assertEqual(("02/01/2021-Jane-08:20:23", "Empty", "", "Not empty", "Jane", "5 / 6"), expected[0][0])
+
+    def test_export(self):
+        # exported files hold the result lines, written by batches with progress
+        self.manager.upgrade_status_silently()
+        self.manager.compare()
+        calls = []
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            paths = export.export_results(self.manager, directory, batch_size=2,
+                                          progress=lambda *args: calls.append(args))
+            self.assertEqual(6, len(paths))
+            for kind in export.RESULT_KINDS:
+                for extension, expected in getattr(self.manager, kind).items():
+                    df = pd.read_csv(directory / f"{extension}_{kind}.csv", dtype=str, keep_default_na=False)
+                    assert_frame_equal(expected.astype(str), df, check_dtype=False, check_index_type=False)
+            self.assertEqual(calls[-1][0], calls[-1][1])
+
+            df = pd.read_parquet(export.export_results(self.manager, directory, "parquet")[0])
+            assert_frame_equal(self.manager.differences["tsv"].astype(str), df, check_dtype=False)
+
+            with self.assertRaises(StopError):
+                export.export_results(self.manager, directory, "ods")
+
+    def test_export_excel(self):
+        # workbook sheets are split at the row limit, each with the header
+        self.manager.upgrade_status_silently()
+        self.manager.compare()
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(export, "EXCEL_MAX_ROWS", 3):
+            path = export.export_results(self.manager, pathlib.Path(directory), "xlsx")[0]
+            with zipfile.ZipFile(path) as workbook:
+                sheets = re.findall(r'<sheet name="([^"]+)"', workbook.read("xl/workbook.xml").decode())
+                rows = [[re.findall(r"<t>([^<]*)</t>", row) for row in re.findall(r"<row .*?</row>", xml)]
+                        for xml in (workbook.read(f"xl/worksheets/sheet{i}.xml").decode() for i in (3, 4))]
+
+        self.assertEqual(["differences", "in_one", "not_compared", "not_compared (2)"], sheets)
+        expected = self.manager.not_compared["tsv"]
+        self.assertEqual([expected.columns.tolist()] * 2, [sheet_rows[0] for sheet_rows in rows])
+        self.assertEqual(expected.values.tolist(), rows[0][1:] + rows[1][1:])
+
+    def test_cli(self):
+        # command line compares the selection, writes summary and results, without the gui
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            self.assertEqual(cli.EXIT_DIFFERENT, cli.main(["data/selection.json", "--output", str(directory),
+                                                           "--mode", "sorted", "--set-workers", "2"]))
+            with open(directory / cli.SUMMARY_FILE) as f:
+                summary = json.load(f)
+            self.assertEqual([1, 0], summary["results"]["tsv"]["nb_in_one"])
+            self.assertEqual(7, len(list(directory.iterdir())))
+
+            self.assertEqual(cli.EXIT_ERROR, cli.main(["data/selection.json", "--directories", "data/a", "missing"]))
+
+            # the reason why a set can't be imported is logged
+            with open("data/selection.json") as f:
+                selection = json.load(f)
+            selection["comparators"][0]["compare_columns"].append("Missing")
+            with open(directory / "selection.json", "w") as f:
+                json.dump(selection, f)
+            with self.assertLogs(cli.logger, "ERROR") as logs:
+                self.assertEqual(cli.EXIT_ERROR, cli.main([str(directory / "selection.json"),
+                                                           "--directories", "data/a", "data/b"]))
+            self.assertIn("Les colonnes à comparer ne sont pas toutes disponibles", logs.output[0])
+        self.assertNotIn("PySide2", sys.modules)
+
+    def _import(self, directory: Optional[pathlib.Path] = None, **properties) -> pd.DataFrame:
+        """Imports the first set of a new selection (no imported columns to reuse) with properties"""
+        csv_set = CsvManager.parse_file("data/selection.json").comparators[0].csv_sets[0]
+        if directory:
+            csv_set.update_sources(name="Before", directory=directory)
+        for name, value in properties.items():
+            setattr(csv_set, name, value)
+        csv_set.upgrade_status()
+        csv_set.import_data()
+        return csv_set.df
+
+    def test_parser_engines(self):
+        # every engine must give the same data (pyarrow needs utf8, no comment, skipped blank lines)
+        dfs = [self._import(engine=engine, comment=None, skip_blank_lines=True)
+               for engine in ("python", "c", "pyarrow")]
+        for df in dfs[1:]:
+            assert_frame_equal(dfs[0], df)
+
+    def test_parser_engines_blank_lines(self):
+        # comment and blank lines inside the data give the same data whatever the engine selected
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            with open(directory / "file.tsv", "w") as f:
+                f.write("# title\nDate\tTime\tEmpty\tName\tVal1\tVal2\tVal3\n"
+                        "01/01/2021\t08:20:23\t\tBob\t5\t5\t5\n\n# comment\n\n"
+                        "01/01/2021\t08:35:05\t\tAlice\t1\t2\t3\n")
+
+            for skip_blank_lines in (False, True):
+                assert_frame_equal(self._import(directory, engine="python", skip_blank_lines=skip_blank_lines),
+                                   self._import(directory, engine="auto", skip_blank_lines=skip_blank_lines))
+
+            # blank lines before the header: no columns, status is not upgraded
+            with open(directory / "file.tsv", "w") as f:
+                f.write("\n\nDate\tTime\tEmpty\tName\tVal1\tVal2\tVal3\n")
+            csv_set = self.manager.comparators[0].csv_sets[0]
+            csv_set.skip_blank_lines = False
+            csv_set.update_sources(name="Before", directory=directory)
+            csv_set.upgrade_status_silently()
+            self.assertEqual(Status.FILES_SELECTED, csv_set.status)
+
+    def test_parser_engines_short_lines(self):
+        # lines refused by pyarrow (missing trailing fields, whitespace only) are parsed again by pandas
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            with open(directory / "file.tsv", "w") as f:
+                f.write(" \nDate\tTime\tEmpty\tName\tVal1\tVal2\tVal3\n"
+                        "01/01/2021\t08:20:23\t\tBob\t5\t5\t5\n \n"
+                        "01/01/2021\t08:35:05\t\tAlice\t1\n")
+
+            expected = self._import(directory, engine="python", comment=None, skip_blank_lines=True)
+            for engine in ("c", "auto"):
+                with self.assertLogs("api.csv_set", "INFO") if engine == "auto" else contextlib.nullcontext():
+                    df = self._import(directory, engine=engine, comment=None, skip_blank_lines=True)
+                assert_frame_equal(expected, df)
+            self.assertEqual(["5", ""], expected["Val2"].tolist())
+
+    def test_header_cache(self):
+        # columns are read once, then from the cache file, until the file changes
+        self.manager.upgrade_status_silently()
+        self.assertTrue(header_cache.path.is_file())
+
+        header_cache.use(header_cache.path)  # loaded again from the file
+        manager = CsvManager.parse_file("data/selection.json")
+        with mock.patch.object(CsvSet, "_sniff_columns") as sniff:
+            manager.upgrade_status_silently()
+        sniff.assert_not_called()
+        self.assertEqual(Status.READY_TO_IMPORT, manager.status)
+
+    def test_header_after_first_bytes(self):
+        # header further than the bytes sniffed is found reading the whole file
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            with open(directory / "file.tsv", "w") as f:
+                f.write("# comment\n" * 10_000)
+                f.write("Date\tTime\tEmpty\tName\tVal1\tVal2\tVal3\n01/01/2021\t08:20:23\t\tBob\t5\t5\t5\n")
+            self.assertGreater((directory / "file.tsv").stat().st_size, HEADER_SNIFF_SIZE)
+
+            csv_set = self.manager.comparators[0].csv_sets[0]
+            csv_set.update_sources(name="Before", directory=directory)
+            csv_set.upgrade_status()
+            self.assertEqual(("Date", "Time", "Empty", "Name", "Val1", "Val2", "Val3"), csv_set.original_columns)
+
+    def test_key_collision(self):
+        # values containing the id separator must not give the same key
+        csv_set = self.manager.comparators[0].csv_sets[0]
+        csv_set.index_columns = {"Date", "Name"}
+        keys = csv_set._make_key(pd.DataFrame({"Date": ["a-b", "a"], "Name": ["c", "b-c"]}))
+        self.assertEqual(keys.nunique(), 2)
+        self.assertEqual(csv_set.readable_id(keys).tolist(), ["a-b-c", "a-b-c"])
+
+    def test_memory_budget(self):
+        # lean comparison gives the same results, and the comparison stops when over budget
+        self.manager.upgrade_status_silently()
+        comparator = self.manager.comparators[0]
+        comparator.lean = True
+        comparator.compare()
+        self.assertEqual(2, comparator.result.nb_differences)
+        self.assertEqual(["Name", "Val3", "row_key", "set"], comparator.csv_sets[0].df.columns.tolist())
+
+        comparator.memory_budget = 1000
+        with self.assertRaises(StopError):
+            comparator.compare()
+
+    def test_compare_workers(self):
+        # extensions compared in a process pool give the same results as compared one after the other
+        expected = self._compare()
+        expected_counts = {extension: vars(result) for extension, result in self.manager.results.items()}
+
+        self.manager = CsvManager.parse_file("data/selection.json")
+        self.manager.workers = 2
+        for _ in range(2):  # second comparison sends comparators with previous results
+            self.assert_results_equal(expected, self._compare())
+            self.assertEqual(expected_counts, {extension: vars(result)
+                                               for extension, result in self.manager.results.items()})
+            self.assertEqual(Status.DATA_IMPORTED, self.manager.status)
+
+    def test_partitioned(self):
+        # comparing partitions on disk gives the same results as comparing in memory
+        expected = self._compare()
+
+        for comparator in self.manager.comparators:
+            comparator.mode = "partitioned"
+            comparator.partitions = 3
+            comparator.chunk_size = 2  # files are partitioned chunk by chunk
+        results = self._compare()
+
+        self.assert_results_equal(expected, results)
+        self.assertEqual((4, 4), self.manager.results["tsv"].nb_in_both)
+
+    def test_sorted(self):
+        # merging sorted sets chunk by chunk gives the same results as comparing in memory
+        expected = self._compare()
+
+        for comparator in self.manager.comparators:
+            comparator.mode = "sorted"
+            comparator.chunk_size = 1
+        results = self._compare()
+
+        self.assert_results_equal(expected, results)
+        self.assertEqual((2, 2), self.manager.results["tsv"].nb_not_comparable)
+
+        # lines not sorted: compared in memory
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            for file in pathlib.Path("data/a").glob("*.tsv"):
+                shutil.copy(file, directory / file.name.replace("file1", "file3"))
+
+            comparator = self.manager.comparators[0]
+            comparator.csv_sets[0].update_sources(name="Before", directory=directory)
+            comparator.csv_sets[0].upgrade_status()
+            with self.assertLogs("api.csv_comparator", "INFO"):
+                comparator.compare()
+            self.assertEqual(2, comparator.result.nb_differences)
+
+    def test_sorted_files_order(self):
+        # all modes read the files of a set in name order: lines not compared come out in the same order
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            for name, files in (("a", {"a.tsv": "k1\t1\n", "z.tsv": "k1\t2\n"}), ("b", {"b.tsv": "k1\t3\n"})):
+                (directory / name).mkdir()
+                for file_name, lines in files.items():
+                    (directory / name / file_name).write_text("k\tv\n" + lines)
+
+            not_compared = []
+            for mode in ("memory", "sorted"):
+                csv_set = {"separator": "\t", "header": 0}
+                manager = CsvManager.parse_obj({
+                    "directories": [directory / "a", directory / "b"],
+                    "comparators": [{"extension": "tsv", "mode": mode, "index_columns": ["k"], "compare_columns": ["v"],
+                                     "display_columns": ["k", "v"], "csv_sets": [dict(csv_set), dict(csv_set)]}]})
+                manager.upgrade_status_silently()
+                manager.compare()
+                not_compared.append(manager.not_compared["tsv"]["v"].tolist())
+        self.assertEqual(["1", "2", "3"], not_compared[0])
+        self.assertEqual(not_compared[0], not_compared[1])
+
+    def test_cache(self):
+        # data loaded from cache is the same as parsed data, cache is cleared on demand
+        with tempfile.TemporaryDirectory() as cache_dir:
+            csv_set = self.manager.comparators[0].csv_sets[0]
+            csv_set.cache_dir = pathlib.Path(cache_dir)
+            (csv_set.cache_dir / "user.pkl").write_bytes(b"")  # not a cache entry, never removed
+            csv_set.upgrade_status()
+            csv_set.import_data()
+            parsed = csv_set.df
+            self.assertEqual(2, len(list(csv_set.cache_dir.iterdir())))
+
+            csv_set.import_data()
+            assert_frame_equal(parsed, csv_set.df)
+
+            csv_set.clear_cache()
+            self.assertEqual(["user.pkl"], [path.name for path in csv_set.cache_dir.iterdir()])
+
+    def test_incremental_import(self):
+        # only modified and added files are parsed again, data is the same as a full import
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            for file in pathlib.Path("data/a").glob("*.tsv"):
+                shutil.copy(file, directory)
+
+            csv_set = self.manager.comparators[0].csv_sets[0]
+            csv_set.update_sources(name="Before", directory=directory)
+            csv_set.incremental = True
+            csv_set.upgrade_status()
+            csv_set.import_data()
+
+            with open(directory / "file2.tsv", "a") as f:
+                f.write("03/01/2021\t08:20:23\t\tJim\t1\t2\t3\n")
+            shutil.copy(directory / "file1.tsv", directory / "file3.tsv")
+            (directory / "file1.tsv").unlink()
+            csv_set.import_data()
+            incremental = csv_set.df
+
+            csv_set.incremental = False
+            csv_set.import_data()
+            assert_frame_equal(csv_set.df, incremental)
+            self.assertIn("Jim", incremental["Name"].tolist())
+
+    def test_selection_change(self):
+        # only newly selected columns are parsed again, data is the same as a full import
+        csv_set = self.manager.comparators[0].csv_sets[0]
+        csv_set.incremental = True
+        csv_set.update_selected_columns(index_columns={"Date", "Time", "Name"}, compare_columns={"Val1"},
+                                        display_columns=["Name"])
+        csv_set.import_data()
+        csv_set.update_selected_columns(index_columns={"Date", "Time", "Name"}, compare_columns={"Val1", "Val2"},
+                                        display_columns=["Val3"])
+        csv_set.import_data()
+        incremental = csv_set.df
+
+        csv_set.incremental = False
+        csv_set.import_data()
+        assert_frame_equal(csv_set.df, incremental)
+
+    def test_imported_columns_reused(self):
+        # after a selection change, only the columns that were not imported are parsed
+        csv_set = self.manager.comparators[0].csv_sets[0]
+        csv_set.update_selected_columns(index_columns={"Date", "Time", "Name"}, compare_columns={"Val1"},
+                                        display_columns=["Name"])
+        csv_set.import_data()
+        csv_set.update_selected_columns(index_columns={"Date", "Time", "Name"}, compare_columns={"Val1", "Val2"},
+                                        display_columns=["Val3"])
+        with mock.patch.object(CsvSet, "_parse_files", autospec=True, side_effect=CsvSet._parse_files) as parse:
+            csv_set.import_data()
+        self.assertEqual(["Val2", "Val3"], parse.call_args.args[2])
+
+        expected = CsvManager.parse_file("data/selection.json").comparators[0].csv_sets[0]
+        expected.update_selected_columns(index_columns={"Date", "Time", "Name"}, compare_columns={"Val1", "Val2"},
+                                         display_columns=["Val3"])
+        expected.import_data()
+        assert_frame_equal(expected.df, csv_set.df)
+
+    def test_batch_files(self):
+        # files parsed in batches give the same data as files parsed one by one
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            for i in range(3):
+                with open(directory / f"file{i}.tsv", "w") as f:
+                    f.write(f"# file {i}\nDate\tTime\tEmpty\tName\tVal1\tVal2\tVal3\n"
+                            f"01/01/2021\t08:20:23\t\tBob{i}\t5\t5\t5\n\n"
+                            f"# comment\n01/01/2021\t08:35:05\t\t Alice{i}\t1\t2\t3")
+
+            csv_set = self.manager.comparators[0].csv_sets[0]
+            csv_set.update_sources(name="Before", directory=directory)
+            csv_set.upgrade_status()
+            csv_set.import_data()
+            expected = csv_set.df
+
+            csv_set.batch_files = True
+            csv_set.import_data()
+            assert_frame_equal(expected, csv_set.df)
+
+    def test_compressed_files(self):
+        # compressed files are found and decompressed while parsing
+        csv_set = self.manager.comparators[0].csv_sets[0]
+        csv_set.upgrade_status()
+        csv_set.import_data()
+        expected = csv_set.df
+
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            for file in pathlib.Path("data/a").glob("*.tsv"):
+                with open(file, "rb") as f, gzip.open(directory / f"{file.name}.gz", "wb") as compressed:
+                    compressed.write(f.read())
+
+            csv_set.update_sources(name="Before", directory=directory)
+            csv_set.upgrade_status()
+            estimated = csv_set.estimate_memory_usage()
+            csv_set.import_data()
+            assert_frame_equal(expected.sort_values("Name", ignore_index=True),
+                               csv_set.df.sort_values("Name", ignore_index=True))
+
+            # memory is estimated from the decompressed size
+            csv_set.update_sources(name="Before", directory=pathlib.Path("data/a"))
+            csv_set.upgrade_status()
+            self.assertEqual(csv_set.estimate_memory_usage(), estimated)
+
+            # a file both compressed and not compressed would be imported twice
+            shutil.copy("data/a/file1.tsv", directory)
+            with self.assertRaises(StopError):
+                csv_set.update_sources(name="Before", directory=directory)
+
+    def test_categorical_columns(self):
+        # columns stored as categoricals give the same results, with decoded values
+        expected = self._compare()
+
+        for comparator in self.manager.comparators:
+            comparator.csv_sets[0].categorical_columns = {"Val3", "Name"}
+            comparator.csv_sets[1].categorical_threshold = 1.0
+        results = self._compare()
+
+        csv_sets = self.manager.comparators[0].csv_sets
+        self.assertEqual("category", csv_sets[0].df["Val3"].dtype)
+        self.assertEqual("category", csv_sets[1].df["Val1"].dtype)
+        for column in ("Val1", "Val3"):  # one dictionary for both sets
+            self.assertTrue(csv_sets[0].df[column].cat.categories.equals(csv_sets[1].df[column].cat.categories))
+        self.assert_results_equal(expected, results)
+
+    def test_categorical_index(self):
+        # keys of a categorical index column with stripped values are sorted like strings
+        with tempfile.TemporaryDirectory() as directory:
+            directory = pathlib.Path(directory)
+            for name, lines in (("a", " b\t1\na\t1\nc\t1\n"), ("b", "b\t2\na\t2\nc\t2\n")):
+                (directory / name).mkdir()
+                (directory / name / "file.tsv").write_text("k\tv\n" + lines)
+
+            ids = []
+            for categorical_columns in (set(), {"k"}):
+                csv_set = {"separator": "\t", "header": 0, "strip": True, "categorical_columns": categorical_columns}
+                manager = CsvManager.parse_obj({
+                    "directories": [directory / "a", directory / "b"],
+                    "comparators": [{"extension": "tsv", "index_columns": ["k"], "compare_columns": ["v"],
+                                     "display_columns": ["k"], "csv_sets": [dict(csv_set), dict(csv_set)]}]})
+                manager.comparators[0].upgrade_status()
+                manager.compare()
+                ids.append(manager.differences["tsv"]["id"].tolist())
+        self.assertEqual([["a", "b", "c"]] * 2, ids)
+
+    def test_arrow_strings(self):
+        # strings held in arrow arrays give the same results, results hold python strings
+        expected = self._compare()
+
+        for comparator in self.manager.comparators:
+            for csv_set in comparator.csv_sets:
+                csv_set.arrow_strings = True
+        self.manager.comparators[0].csv_sets[0].categorical_columns = {"Val3"}
+        results = self._compare()
+
+        df = self.manager.comparators[0].csv_sets[0].df
+        self.assertEqual("string[pyarrow]", df["Val1"].dtype)
+        self.assertEqual("string[pyarrow]", df["row_key"].dtype)
+        self.assert_results_equal(expected, results)